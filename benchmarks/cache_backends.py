@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+# Compare cache backends on writing, reading and checking empty markers for
+# a number of package sized entries, in a temporary cache directory.
+#
+#   python benchmarks/cache_backends.py --entries 5000
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+
+import citelang.main.cache as cache  # noqa
+import citelang.main.settings as settings  # noqa
+
+# A package payload, like one from libraries.io
+payload = {
+    "description": "A synthetic package " * 10,
+    "homepage": "https://example.com",
+    "keywords": ["synthetic", "package", "benchmark"] * 5,
+    "versions": [
+        {"number": "1.%s.0" % i, "published_at": "2022-01-01T00:00:00.000Z"}
+        for i in range(40)
+    ],
+}
+
+
+def get_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(root, x)) for x in files)
+    return size
+
+
+def timed(func, names):
+    start = time.time()
+    for name in names:
+        func(name)
+    return len(names) / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cache backend benchmark")
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--backends", nargs="+", default=list(cache.backends))
+    args = parser.parse_args()
+
+    names = ["package/pypi/package-%s/1.0.0" % i for i in range(args.entries)]
+    print("%-12s %12s %12s %12s %10s" % ("backend", "set/s", "get/s", "empty/s", "MB"))
+    for name in args.backends:
+        if name == "lmdb" and not importlib.util.find_spec("lmdb"):
+            print("%-12s lmdb is not installed" % name)
+            continue
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            settings.cfg.set("cache_dir", cache_dir)
+            backend = cache.get_backend(name)
+            with backend.batch():
+                writes = timed(lambda x: backend.set(x, payload), names)
+
+            # A new backend (e.g., connection) to read
+            backend = cache.get_backend(name)
+            reads = timed(backend.get, names)
+            empty = timed(backend.is_empty, names)
+            assert backend.get(names[0]) == json.loads(json.dumps(payload))
+            size = get_size(cache_dir) / 1024 / 1024
+            print("%-12s %12d %12d %12d %10.1f" % (name, writes, reads, empty, size))
+            if hasattr(backend, "close"):
+                backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# Compare the size of a filesystem cache directory and cold Cache.get
+# throughput for pretty printed json (how entries used to be written) and
+# each cache_encoding and cache_compression, for package sized entries.
+#
+#   python benchmarks/cache_encoding.py --entries 5000
+
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+
+import citelang.main.cache as cache  # noqa
+import citelang.main.settings as settings  # noqa
+import citelang.utils as utils  # noqa
+
+# A package payload, like one from libraries.io (with a long versions list)
+payload = {
+    "description": "A synthetic package " * 10,
+    "homepage": "https://example.com",
+    "keywords": ["synthetic", "package", "benchmark"] * 5,
+    "versions": [
+        {
+            "number": "1.%s.0" % i,
+            "published_at": "2022-01-01T00:00:00.000Z",
+            "spdx_expression": "MIT",
+            "original_license": "MIT",
+            "researched_at": None,
+            "repository_sources": ["Pypi"],
+        }
+        for i in range(200)
+    ],
+}
+
+formats = [
+    ("pretty", None, None),
+    ("json", "json", None),
+    ("json+gzip", "json", "gzip"),
+    ("json+zstd", "json", "zstd"),
+    ("msgpack", "msgpack", None),
+    ("msgpack+gzip", "msgpack", "gzip"),
+    ("msgpack+zstd", "msgpack", "zstd"),
+]
+
+
+def get_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(root, x)) for x in files)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cache encoding benchmark")
+    parser.add_argument("--entries", type=int, default=5000)
+    args = parser.parse_args()
+
+    names = ["package/pypi/package-%s" % i for i in range(args.entries)]
+    settings.cfg.set("disable_memory_cache", True)
+    print("%-14s %10s %12s" % ("format", "MB", "cold get/s"))
+    for label, encoding, compression in formats:
+        if encoding == "msgpack" and not importlib.util.find_spec("msgpack"):
+            print("%-14s msgpack is not installed" % label)
+            continue
+        if compression == "zstd" and not importlib.util.find_spec("zstandard"):
+            print("%-14s zstandard is not installed" % label)
+            continue
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            settings.cfg.set("cache_dir", cache_dir)
+            settings.cfg.set("cache_encoding", encoding or "json")
+            settings.cfg.set("cache_compression", compression)
+            backend = cache.get_backend("filesystem")
+            for name in names:
+                if encoding:
+                    backend.set(name, payload)
+                else:
+                    path = backend.get_cache_name(name)
+                    utils.mkdir_p(os.path.dirname(path))
+                    utils.write_json(payload, path)
+            size = get_size(cache_dir) / 1024 / 1024
+
+            # A new cache (nothing in memory) to read everything back
+            db = cache.Cache(cache.get_backend("filesystem"))
+            start = time.time()
+            for name in names:
+                db.get(name)
+            reads = len(names) / (time.time() - start)
+            assert db.get(names[0])["versions"][-1]["number"] == "1.199.0"
+            print("%-14s %10.1f %12d" % (label, size, reads))
+
+
+if __name__ == "__main__":
+    main()
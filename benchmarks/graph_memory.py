@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+# Measure the peak memory (RSS) and time to build a large credit graph.
+# Packages come from a synthetic (3-ary) dependency tree, where each package
+# also depends on one of a small set of common packages, and each lookup
+# returns a payload about the size of a libraries.io package. With the
+# defaults (25000 packages, 50 common) the tree has 50000 nodes, a node for
+# each package and one for the common package under each.
+#
+#   python benchmarks/graph_memory.py --packages 25000 --common 50
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+
+import citelang.main.base as base  # noqa
+import citelang.main.package as package  # noqa
+
+# A package payload, as we'd load it from the cache
+payload = json.dumps(
+    {
+        "description": "A synthetic package " * 10,
+        "homepage": "https://example.com",
+        "keywords": ["synthetic", "package", "benchmark"] * 5,
+        "versions": [
+            {"number": "1.%s.0" % i, "published_at": "2022-01-01T00:00:00.000Z"}
+            for i in range(40)
+        ],
+    }
+)
+
+
+def get_dependencies(index, packages, common):
+    """
+    Dependencies are the next level of the tree, and one common package
+    """
+    if index is None:
+        return []
+    deps = [
+        "package-%s" % child
+        for child in range(3 * index + 1, 3 * index + 4)
+        if child < packages
+    ]
+    return deps + ["common-%s" % (index % common)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="credit graph memory benchmark")
+    parser.add_argument("--packages", type=int, default=25000)
+    parser.add_argument("--common", type=int, default=50)
+    args = parser.parse_args()
+
+    class SyntheticPackage(package.PackageBase):
+        def dependencies(self, return_data=False):
+            index = None
+            if self.name.startswith("package-"):
+                index = int(self.name.split("-", 1)[-1])
+            self.data["package"] = json.loads(payload)
+            self.version = "1.0.0"
+            deps = [
+                {
+                    "name": name,
+                    "project_name": name,
+                    "platform": "pypi",
+                    "requirements": ">=1.0",
+                    "latest_stable": "1.39.0",
+                    "kind": "runtime",
+                }
+                for name in get_dependencies(index, args.packages, args.common)
+            ]
+            self.data["dependencies"] = deps
+            return deps
+
+    def get_package(manager, name, *_args, **kwargs):
+        return SyntheticPackage(manager, name)
+
+    package.get_package = get_package
+    base.BaseClient.check_manager = lambda *_args: None
+
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    root = base.BaseClient()._graph("pypi", "package-0", min_credit=0, credit_split=0.5)
+    elapsed = time.time() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    nodes = sum(1 for _ in root.iternodes())
+
+    print("nodes: %s" % nodes)
+    print("time: %.2f seconds" % elapsed)
+    print(
+        "peak rss: %.1f MB (%.1f MB for the graph)"
+        % (peak_rss / 1024, (peak_rss - start_rss) / 1024)
+    )
+
+
+if __name__ == "__main__":
+    main()
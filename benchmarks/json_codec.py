@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+# Compare how fast json and orjson (if installed) load and dump cache
+# entries, and write them pretty printed (how write_json always wrote) or
+# compact. By default we use entries from the cache (cache_dir, or the
+# --cache-dir given), or package sized entries if there are few.
+#
+#   python benchmarks/json_codec.py --entries 2000
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here))
+
+import citelang.main.cache as cache  # noqa
+import citelang.utils as utils  # noqa
+import citelang.utils.fileio as fileio  # noqa
+
+# A package payload, like one from libraries.io (with a long versions list)
+payload = {
+    "name": "package",
+    "homepage": "https://example.com",
+    "licenses": "MIT",
+    "latest_release_number": "1.199.0",
+    "versions": [
+        {"number": "1.%s.0" % i, "published_at": "2022-01-01T00:00:00.000Z"}
+        for i in range(200)
+    ],
+}
+
+
+def get_entries(cache_dir, count):
+    """
+    Get up to count entries (not pointers to a blob) from a cache
+    """
+    entries = []
+    if cache_dir and os.path.exists(cache_dir):
+        backend = cache.get_backend("filesystem", cache_dir=cache_dir)
+        for name, _ in backend.iterate():
+            data = backend.get(name)
+            if data and not cache.get_blob(data):
+                entries.append(data)
+            if len(entries) >= count:
+                break
+    return entries
+
+
+def timeit(func, items):
+    start = time.time()
+    for item in items:
+        func(item)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="json codec benchmark")
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--cache-dir", help="cache to read entries from")
+    args = parser.parse_args()
+
+    import citelang.main.settings as settings
+
+    entries = get_entries(args.cache_dir or settings.cfg.cache_dir, args.entries)
+    source = "from the cache"
+    if len(entries) < 100:
+        entries = [payload] * args.entries
+        source = "package sized"
+    content = [json.dumps(x, separators=(",", ":")).encode("utf-8") for x in entries]
+    size = sum(len(x) for x in content) / 1024 / 1024
+    print("%s entries %s (%.1f MB of json)\n" % (len(entries), source, size))
+
+    codecs = [("json", None)]
+    if fileio.orjson is not None:
+        codecs.append(("orjson", fileio.orjson))
+    else:
+        print("orjson is not installed, pip install citelang[orjson]\n")
+
+    print(
+        "%-8s %12s %12s %14s %14s"
+        % ("codec", "loads/s", "dumps/s", "pretty MB/s", "compact MB/s")
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "entry.json")
+        for label, codec in codecs:
+            fileio.orjson = codec
+            loads = len(entries) / timeit(utils.loads_json, content)
+            dumps = len(entries) / timeit(utils.dumps_json, entries)
+            pretty = size / timeit(lambda x: utils.write_json(x, filename), entries)
+            compact = size / timeit(
+                lambda x: utils.write_json(x, filename, pretty=False), entries
+            )
+            print(
+                "%-8s %12d %12d %14.1f %14.1f" % (label, loads, dumps, pretty, compact)
+            )
+
+
+if __name__ == "__main__":
+    main()
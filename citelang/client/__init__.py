@@ -43,6 +43,22 @@ def get_parser():
         action="store_true",
     )
 
+    parser.add_argument(
+        "--refresh-stale",
+        dest="refresh_stale",
+        help="refresh cache entries older than cache_ttl (instead of all with --no-cache).",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--stats",
+        dest="stats",
+        help="print cache (and request) counts for the command when it exits.",
+        default=False,
+        action="store_true",
+    )
+
     parser.add_argument(
         "--version",
         dest="version",
@@ -71,16 +87,92 @@ def get_parser():
     ls.add_argument("--outfile", "-o", help="write content to output file")
 
     # Cache control
-    cache = subparsers.add_parser("cache", description="cache control")
+    cache = subparsers.add_parser(
+        "cache",
+        description="cache control",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
     cache.add_argument(
         "--clear", help="clear the cache", default=False, action="store_true"
     )
+    cache.add_argument(
+        "--migrate",
+        help="import a directory cache (defaults to cache_dir) into another backend",
+        nargs="?",
+        const="",
+        default=None,
+    )
+    cache.add_argument(
+        "--backend",
+        help="backend to migrate to (required unless cache_backend is sqlite or lmdb)",
+        choices=["sqlite", "lmdb"],
+    )
+    cache.add_argument(
+        "action",
+        help="""warm: look up the dependencies of manifests or manager:name pairs into the cache
+export: write the cache (or what manifests or manager:name pairs use) to a bundle
+import: merge bundles into the cache
+stats: show the size of the cache by endpoint and manager
+prune: remove entries not used recently, or least recently used to a size""",
+        nargs="?",
+        choices=["warm", "export", "import", "stats", "prune"],
+    )
+    cache.add_argument(
+        "specs",
+        help="manifests (e.g., requirements.txt, package.json) or manager:name pairs, or bundles to import",
+        nargs="*",
+    )
+    cache.add_argument(
+        "--outfile",
+        "-o",
+        help="bundle file to export to (defaults to citelang-cache.bundle)",
+        default="citelang-cache.bundle",
+    )
+    cache.add_argument(
+        "--max-size",
+        help="prune the least recently used entries until the cache is this size (e.g., 500M or 2G)",
+    )
+    cache.add_argument(
+        "--older-than",
+        type=float,
+        help="prune entries not used in this many days",
+    )
+    cache.add_argument(
+        "--manager",
+        help="only prune entries for this manager (can be used more than once)",
+        action="append",
+        dest="managers",
+    )
+    cache.add_argument(
+        "--dry-run",
+        help="show what prune would remove, without removing it",
+        default=False,
+        action="store_true",
+    )
+    cache.add_argument(
+        "--rate",
+        type=int,
+        help="most requests a minute to warm the cache (default is 60)",
+        default=60,
+    )
+    cache.add_argument(
+        "--json",
+        help="print stats (for warm, stats or prune) as json",
+        default=False,
+        action="store_true",
+    )
 
     # Get a package or dependencies
     pkg = subparsers.add_parser(
         "package",
         description="list package managers available to derive citations from.",
     )
+    pkg.add_argument(
+        "--full",
+        help="retrieve every field for the package (the cache only keeps what citelang uses)",
+        default=False,
+        action="store_true",
+    )
     deps = subparsers.add_parser("deps", description="list dependencies for a package.")
 
     # Extract contributions from a GitHub repo
@@ -168,6 +260,47 @@ def get_parser():
     credit = subparsers.add_parser(
         "credit", description="calculate dependency credit for a package."
     )
+    resolve = subparsers.add_parser(
+        "resolve",
+        description="resolve (and save) a dependency graph to calculate credit from later.",
+    )
+    resolve.add_argument("--outfile", "-o", help="Save to an output json file.")
+
+    sweep = subparsers.add_parser(
+        "sweep",
+        description="calculate credit for a grid of credit split and min credit values.",
+    )
+    sweep.add_argument(
+        "--outfile", "-o", help="Save to an output file (csv, tsv, or json)."
+    )
+    sweep.add_argument(
+        "--credit-split",
+        help="one or more credit splits to calculate credit for",
+        type=float,
+        nargs="+",
+        default=[0.1, 0.3, 0.5, 0.7, 0.9],
+    )
+    sweep.add_argument(
+        "--min-credit",
+        help="one or more minimum credits to calculate credit for",
+        type=float,
+        nargs="+",
+        default=[0.001, 0.005, 0.01, 0.05],
+    )
+    sweep.add_argument(
+        "--max-depth", type=int, help="maximum depth to parse tree (default is unset)"
+    )
+    sweep.add_argument(
+        "--max-deps",
+        type=int,
+        help="maximum number of dependencies to include (default is unset)",
+    )
+    sweep.add_argument(
+        "--workers",
+        type=int,
+        help="number of workers to retrieve each level of dependencies (default is serial)",
+    )
+
     gen = subparsers.add_parser(
         "gen", description="Generate a credit markdown file for a package of choice."
     )
@@ -179,7 +312,7 @@ def get_parser():
     render.add_argument("filename", help="Markdown file to render software table into.")
     render.add_argument("--outfile", "-o", help="Save to an output json file.")
 
-    for command in [pkg, deps, graph, credit, badge, gen]:
+    for command in [pkg, deps, graph, credit, badge, gen, resolve, sweep]:
         command.add_argument(
             "package", help="package manager and name to parse", nargs=2
         )
@@ -194,7 +327,7 @@ def get_parser():
         )
         command.add_argument("--outfile", "-o", help="Save to an output json file.")
 
-    for command in [graph, credit, badge, render, gen]:
+    for command in [graph, credit, badge, render, gen, resolve, cache]:
         command.add_argument(
             "--max-depth", type=int, help="maximum depth to parse tree (default is unset)"
         )
@@ -215,6 +348,42 @@ def get_parser():
             type=float,
             default=0.5,
         )
+        command.add_argument(
+            "--workers",
+            type=int,
+            help="number of workers to retrieve each level of dependencies (default is serial)",
+        )
+        command.add_argument(
+            "--traversal",
+            help="order to look into dependencies, best-first spends --max-deps on the packages with the most credit",
+            choices=["bfs", "best-first"],
+            default="bfs",
+        )
+        command.add_argument(
+            "--dag",
+            help="parse each package once, and give shared packages credit from each parent",
+            default=False,
+            action="store_true",
+        )
+
+    for command in [credit, badge, render, gen]:
+        command.add_argument(
+            "--deadline",
+            type=float,
+            help="stop looking up dependencies after this many seconds (default is unset)",
+        )
+
+    for command in [graph, credit, badge, render, gen]:
+        command.add_argument(
+            "--resolved",
+            help="calculate credit from a graph saved with citelang resolve (no requests)",
+        )
+        command.add_argument(
+            "--exact",
+            help="calculate credit for each unique package in topological order (without a min credit)",
+            default=False,
+            action="store_true",
+        )
 
     # Local shell with client loaded
     shell = subparsers.add_parser(
@@ -290,6 +459,20 @@ def run():
         debug=args.debug,
     )
 
+    # Refresh stale cache entries for this command only
+    if args.refresh_stale:
+        import citelang.main.settings as settings
+
+        settings.cfg.set("refresh_stale", True)
+
+    # Print cache counts when we exit (including sys.exit from a command)
+    if args.stats:
+        import atexit
+
+        from .cache import print_counts
+
+        atexit.register(print_counts)
+
     # retrieve subparser (with help) from parser
     helper = None
     subparsers_actions = [
@@ -321,8 +504,12 @@ def run():
         from .graph import main
     elif args.command == "render":
         from .render import main
+    elif args.command == "resolve":
+        from .resolve import main
     elif args.command == "shell":
         from .shell import main
+    elif args.command == "sweep":
+        from .sweep import main
     elif args.command == "list":
         from .listing import main
     elif args.command == "package":
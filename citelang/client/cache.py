@@ -2,8 +2,14 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2022, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
+import sys
+
 import citelang.main.cache as cache
+import citelang.main.http as http
 import citelang.main.settings as settings
+import citelang.utils as utils
+from citelang.logger import logger
+from citelang.main.parser import Parser
 
 
 def main(args, parser, extra, subparser):
@@ -11,7 +17,169 @@ def main(args, parser, extra, subparser):
     # init global settings
     cli = cache.cache
 
-    if args.clear:
+    if args.action == "warm":
+        warm(args)
+
+    elif args.action == "export":
+        export(args)
+
+    elif args.action == "stats":
+        stats(args)
+
+    elif args.action == "prune":
+        prune(args)
+
+    # Merge bundles into the cache
+    elif args.action == "import":
+        if not args.specs:
+            logger.exit("Please provide one or more bundles to import.")
+        for path in args.specs:
+            entries, empty = cli.migrate(cache.BundleBackend(path), merge=True)
+            logger.info(
+                "Imported %s entries and %s empty markers from %s"
+                % (entries, empty, path)
+            )
+
+    elif args.clear:
         cli.clear(force=args.force)
+
+    # Import a directory cache into another backend
+    elif args.migrate is not None:
+        backend = args.backend or settings.cfg.cache_backend or "filesystem"
+        if backend == "filesystem":
+            logger.exit(
+                "Please choose a backend to migrate to with --backend (sqlite or lmdb)."
+            )
+        source = args.migrate or settings.cfg.cache_dir
+        cli = cache.Cache(backend)
+        if not utils.confirm_action(
+            "Import the directory cache %s into %s (%s)? "
+            % (source, backend, cli.backend.db_path),
+            force=args.force,
+        ):
+            return
+        entries, empty = cli.migrate(source)
+        logger.info(
+            "Imported %s entries and %s empty markers into %s"
+            % (entries, empty, cli.backend.db_path)
+        )
+        if settings.cfg.cache_backend != backend:
+            logger.info("Use it with: citelang config set cache_backend:%s" % backend)
     else:
         print(settings.cfg.cache_dir)
+
+
+def export(args):
+    """
+    Write the cache to a bundle, or only what manifests or manager:name pairs
+    use (looking up what we don't have).
+    """
+    cli = cache.cache
+    recorded = None
+    if args.specs:
+        with cli.recording() as recorded:
+            resolve(args)
+    entries, empty = cli.export(args.outfile, recorded)
+    logger.info(
+        "Exported %s entries and %s empty markers to %s"
+        % (entries, empty, args.outfile)
+    )
+
+
+def stats(args):
+    """
+    Show the size (as stored) of the cache by endpoint and manager
+    """
+    cli = cache.cache
+    usage = cli.usage()
+    if args.json:
+        print(utils.print_json(usage))
+        return
+
+    total = cli.backend.stats()
+    print("%-20s %-20s %10s %12s" % ("endpoint", "manager", "entries", "MB"))
+    for endpoint, managers in sorted(usage.items()):
+        for manager, entry in sorted(
+            managers.items(), key=lambda x: x[1]["size"], reverse=True
+        ):
+            print(
+                "%-20s %-20s %10s %12.3f"
+                % (endpoint, manager or "-", entry["entries"], entry["size"] / 1e6)
+            )
+    print(
+        "%-20s %-20s %10s %12.3f" % ("total", "", total["entries"], total["size"] / 1e6)
+    )
+    print("%-20s %-20s %10s" % ("empty", "", total["empty"]))
+
+
+def prune(args):
+    """
+    Remove entries not used recently, or least recently used to a size (and
+    always validators for entries we don't have, and store duplicates once)
+    """
+    stats = cache.cache.prune(
+        max_size=utils.parse_size(args.max_size) if args.max_size else None,
+        older_than=args.older_than,
+        managers=args.managers,
+        dry_run=args.dry_run,
+    )
+    if args.json:
+        print(utils.print_json(stats))
+        return
+    if args.dry_run:
+        print("Dry run, nothing was removed.")
+    for key, value in stats.items():
+        print("%20s: %s" % (key, value))
+
+
+def print_counts():
+    """
+    Print cache counts (hits for each tier, bytes read and written, and time
+    to decode) and requests for the run, to stderr to not mix with output.
+    """
+    counts = dict(cache.counts)
+    lookups = sum(
+        counts.get(key, 0)
+        for key in ["memory_hits", "stale", "disk_hits", "disk_misses"]
+    )
+    hits = sum(
+        counts.get(key, 0) for key in ["memory_hits", "disk_hits", "bundle_hits"]
+    )
+    counts["hit_rate"] = round(hits / lookups, 3) if lookups else None
+    counts["decode_seconds"] = round(counts.get("decode_seconds", 0), 3)
+    counts["requests"] = http.counts["requests"]
+    for key, value in sorted(counts.items()):
+        print("%20s: %s" % (key.replace("_", " "), value), file=sys.stderr)
+
+
+def warm(args):
+    """
+    Look up the dependencies of manifests or manager:name pairs into the cache
+    """
+    stats = resolve(args)
+    if args.json:
+        print(utils.print_json(stats))
+        return
+    for key, value in stats.items():
+        if value is not None:
+            print("%20s: %s" % (key.replace("_", " "), value))
+
+
+def resolve(args):
+    """
+    Resolve manifests or manager:name pairs (using the cache) and return stats
+    """
+    if not args.specs:
+        logger.exit("Please provide one or more manifests or manager:name pairs.")
+    return Parser(quiet=args.quiet).warm(
+        args.specs,
+        rate=args.rate,
+        use_cache=not args.no_cache,
+        max_depth=args.max_depth,
+        max_deps=args.max_deps,
+        min_credit=args.min_credit,
+        credit_split=args.credit_split,
+        workers=args.workers,
+        dag=args.dag,
+        traversal=args.traversal,
+    )
@@ -13,9 +13,15 @@ def main(args, parser, extra, subparser):
         manager=args.package[0],
         use_cache=not args.no_cache,
         max_depth=args.max_depth,
-        max_deps=args.max_depth,
+        max_deps=args.max_deps,
         min_credit=args.min_credit,
         credit_split=args.credit_split,
+        workers=args.workers,
+        dag=args.dag,
+        traversal=args.traversal,
+        deadline=args.deadline,
+        resolved=args.resolved,
+        exact=args.exact,
     )
 
     if args.json and not args.outfile:
@@ -16,5 +16,10 @@ def main(args, parser, extra, subparser):
         max_depth=args.max_depth,
         max_deps=args.max_deps,
         credit_split=args.credit_split,
+        workers=args.workers,
+        dag=args.dag,
+        traversal=args.traversal,
+        resolved=args.resolved,
+        exact=args.exact,
         fmt=args.fmt,
     )
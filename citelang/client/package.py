@@ -9,7 +9,10 @@ def main(args, parser, extra, subparser):
 
     cli = Client(quiet=args.quiet)
     result = cli.package(
-        name=args.package[1], manager=args.package[0], use_cache=not args.no_cache
+        name=args.package[1],
+        manager=args.package[0],
+        use_cache=not args.no_cache,
+        full=args.full,
     )
 
     if args.json and not args.outfile:
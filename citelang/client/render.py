@@ -8,15 +8,19 @@ from citelang.main.client import get_parser
 
 def main(args, parser, extra, subparser):
 
-    cli = get_parser(
-        filename=args.filename, quiet=args.quiet, settings_file=args.settings_file
-    )
+    cli = get_parser(filename=args.filename, quiet=args.quiet)
     result = cli.parse(
         use_cache=not args.no_cache,
         max_depth=args.max_depth,
-        max_deps=args.max_depth,
+        max_deps=args.max_deps,
         min_credit=args.min_credit,
         credit_split=args.credit_split,
+        workers=args.workers,
+        dag=args.dag,
+        traversal=args.traversal,
+        deadline=args.deadline,
+        resolved=args.resolved,
+        exact=args.exact,
     )
 
     if args.outfile:
@@ -0,0 +1,27 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+from citelang.main import Client
+
+
+def main(args, parser, extra, subparser):
+
+    cli = Client(quiet=args.quiet)
+    result = cli.resolve(
+        name=args.package[1],
+        manager=args.package[0],
+        use_cache=not args.no_cache,
+        max_depth=args.max_depth,
+        max_deps=args.max_deps,
+        min_credit=args.min_credit,
+        credit_split=args.credit_split,
+        workers=args.workers,
+        dag=args.dag,
+        traversal=args.traversal,
+    )
+
+    if args.outfile:
+        result.save(args.outfile)
+    else:
+        result.print_json()
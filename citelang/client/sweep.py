@@ -0,0 +1,24 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import citelang.main.client as client
+
+
+def main(args, parser, extra, subparser):
+
+    cli = client.get_parser(quiet=args.quiet)
+    cli.add_lib(manager=args.package[0], name=args.package[1])
+    result = cli.sweep(
+        use_cache=not args.no_cache,
+        max_depth=args.max_depth,
+        max_deps=args.max_deps,
+        min_credit=args.min_credit,
+        credit_split=args.credit_split,
+        workers=args.workers,
+    )
+
+    if args.outfile:
+        result.save(args.outfile)
+    else:
+        result.print_result()
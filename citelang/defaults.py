@@ -37,4 +37,4 @@ use_pip = False if os.environ.get("CITELANG_USE_PIP") == "false" else True
 user_settings_file = os.path.join(citelang_home, "settings.yml")
 
 # variables in settings that allow environment variable expansion
-allowed_envars = ["cache_dir"]
+allowed_envars = ["cache_dir", "cache_bundles"]
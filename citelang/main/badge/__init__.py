@@ -35,10 +35,16 @@ def generate(data, outfile=None, min_credit=0.01, credit_split=0.5, height=800):
         branchvalues="total",
     )
 
+    title = (
+        "Credit allocation for %s<br><sup>The total credit graph adds to ~1, and cutoff is %s</sup><br><sup>All children split %s of the parent credit</sup>"
+        % (data["name"], min_credit, credit_split)
+    )
+    if data.get("truncated"):
+        title += "<br><sup>The graph was truncated by a deadline</sup>"
+
     layout = go.Layout(
         title={
-            "text": "Credit allocation for %s<br><sup>The total credit graph adds to ~1, and cutoff is %s</sup><br><sup>All children split %s of the parent credit</sup>"
-            % (data["name"], min_credit, credit_split),
+            "text": title,
             "x": 0.5,
         },
         font={"size": 12},
@@ -2,6 +2,12 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2022, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
+import collections
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import citelang.main.cache as cache
 import citelang.main.endpoints as endpoints
 import citelang.main.graph as graph
@@ -41,7 +47,9 @@ class BaseClient:
         result = self.cache.get("package_managers")
         if not result or not use_cache:
             logger.info("Retrieving new result for package managers...")
-            result = endpoints.get_endpoint("package_managers")
+            result = endpoints.get_endpoint(
+                "package_managers", cache_name="package_managers" if use_cache else None
+            )
 
             # Update custom package managers
             names = [x["name"] for x in result.data]
@@ -50,11 +58,11 @@ class BaseClient:
                 for _, p in packages.managers.items()
                 if p().info()["name"] not in names
             ]
+
+            # If cache is enabled, we save the result (with custom managers)
+            self.cache.set("package_managers", result)
         else:
             result = endpoints.get_endpoint("package_managers", data=result)
-
-        # If cache is enabled, we save the result
-        self.cache.set("package_managers", result)
         return result
 
     def check_manager(self, name, use_cache=True):
@@ -104,11 +112,67 @@ class BaseClient:
         min_credit=0.01,
         credit_split=0.01,
         pkg=None,
+        workers=None,
+        dag=False,
+        resolved=None,
+        traversal="bfs",
+        deadline=None,
+        exact=False,
     ):
         """
         Shared 'private' function to generate graph
+
+        If workers is greater than 1, the dependencies for each level of the
+        tree are retrieved at once with a pool of that many threads. The order
+        we walk the tree (and thus the credit) is the same as the serial walk.
+
+        If dag is True, each package (manager, name, version) is one node
+        that is only parsed once, and a package that is depended on by more
+        than one parent collects credit along each edge.
+
+        If resolved is provided (a graph.Resolved or a filename to load one
+        from) dependencies are looked up there first. A frozen resolved graph
+        is never updated, so we calculate credit without any requests.
+        Otherwise we keep one for this graph, so nodes for the same package
+        share one (slim) record, and it is only looked up once.
+
+        If traversal is "best-first" we expand the node with the most weight
+        next (instead of the next node in the level) so a max_deps budget is
+        spent on the packages that matter most for credit. Either way, the
+        credit left on nodes we didn't expand is root.unexpanded_credit.
+
+        If deadline (in seconds) is set and we run out of time, we stop looking
+        (as we do for max_deps) and mark the root as truncated.
+
+        If exact is True, we resolve each package once (without a min_credit)
+        and calculate credit for the DAG in topological order instead.
         """
-        self.check_manager(manager, use_cache)
+        if exact:
+            return self._exact_graph(
+                manager,
+                name,
+                use_cache=use_cache,
+                max_depth=max_depth,
+                max_deps=max_deps,
+                min_credit=min_credit,
+                credit_split=credit_split,
+                pkg=pkg,
+                workers=workers,
+                resolved=resolved,
+                traversal=traversal,
+                deadline=deadline,
+            )
+
+        start = time.time()
+        if traversal not in ["bfs", "best-first"]:
+            logger.exit("traversal must be one of bfs or best-first.")
+        best_first = traversal == "best-first"
+        if isinstance(resolved, str):
+            resolved = graph.Resolved.load(resolved)
+        if resolved is None or not resolved.frozen:
+            self.check_manager(manager, use_cache)
+        if resolved is None:
+            resolved = graph.Resolved()
 
         # Allow the caller to provide a pre-generated (often custom) package
         if not pkg:
@@ -123,7 +187,8 @@ class BaseClient:
         node_names = set()
 
         # Top node gets full credit 1.0 (to split between itself and deps)
-        root = graph.Node(
+        Node = graph.DAGNode if dag else graph.Node
+        root = Node(
             obj=pkg,
             weight=1.0,
             credit_split=credit_split,
@@ -132,8 +197,23 @@ class BaseClient:
             is_root=True,
         )
 
-        # A pointer to the next node
-        next_nodes = [root]
+        # A pointer to the next node (a heap by weight for best first)
+        next_nodes = collections.deque([root])
+        order = itertools.count()
+        if best_first:
+            next_nodes = [(-root.weight, next(order), root)]
+
+        # Nodes we popped but didn't look into, and all we popped (best first)
+        unexpanded = []
+        popped = set()
+
+        # Unique nodes of a DAG, by manager, name, and version
+        nodes = {root.key: root} if dag else {}
+
+        # DAG nodes we passed credit from (with a count of deps and children),
+        # and nodes we skipped (with their deps) in case they get more credit
+        expanded = {}
+        skipped = {}
 
         # Booleans to trigger exiting parser
         stop_looking = False
@@ -141,16 +221,75 @@ class BaseClient:
         # Keep handle to previous children in case we stop looking
         previous = []
 
+        # Dependencies retrieved ahead of time for a level, if using workers
+        fetched = {}
+
         while next_nodes and not stop_looking:
             # Booleans to skip looking into dependencies of the next node
             skip = False
-            next_node = next_nodes.pop(0)
+            if best_first:
+                next_node = heapq.heappop(next_nodes)[-1]
+
+                # A DAG node can be queued again when it gets more weight
+                if next_node in popped:
+                    continue
+                popped.add(next_node)
+            else:
+                next_node = next_nodes.popleft()
+
+            # Stopping point - out of time, so we don't look up anything else
+            if deadline is not None and time.time() - start > deadline:
+                logger.warning(
+                    "Deadline of %s seconds reached, stopping at %s."
+                    % (deadline, next_node.name)
+                )
+                root.truncated = True
+                unexpanded.append(next_node)
+                if not dag:
+                    next_node.total_credit = next_node.weight
+                    self._redistribute(previous, credit_split)
+                break
+
+            # Retrieve dependencies for the rest of this level (or the heaviest nodes) at once
+            if workers and workers > 1 and next_node not in fetched:
+                if best_first:
+                    level = [
+                        x[-1]
+                        for x in heapq.nsmallest(workers - 1, next_nodes)
+                        if x[-1] not in popped
+                    ]
+                else:
+                    level = list(
+                        itertools.takewhile(
+                            lambda node: node.depth == next_node.depth, next_nodes
+                        )
+                    )
+
+                # Not nodes we won't look into (past max_depth, or too little credit)
+                level = [next_node] + [
+                    node
+                    for node in level
+                    if node not in fetched
+                    and not (max_depth and node.depth > max_depth)
+                    and (1 - credit_split) * node.weight >= min_credit
+                ]
+
+                # Don't retrieve more than we are allowed to look at
+                if max_deps:
+                    level = level[: max(max_deps - len(seen), 1)]
+                fetched.update(
+                    self._fetch_dependencies(
+                        level,
+                        workers,
+                        resolved,
+                        deadline=start + deadline if deadline is not None else None,
+                    )
+                )
 
-            # Sometimes we know a package name / version but cannot get deps
-            try:
-                deps = next_node.obj.dependencies(return_data=True)
-            except Exception:
-                deps = []
+            if next_node in fetched:
+                deps = fetched.pop(next_node)
+            else:
+                deps = self._get_dependencies(next_node, resolved)
             [
                 node_names.add(d["name"])
                 for d in deps
@@ -179,38 +318,30 @@ class BaseClient:
             if dep_credit < min_credit:
                 skip = True
 
+            if stop_looking or skip:
+                unexpanded.append(next_node)
+
+            # A DAG node we don't parse keeps all of its credit
+            if dag and (stop_looking or skip):
+                if stop_looking:
+                    break
+                skipped[next_node] = deps
+                continue
+
             # If we are stopping or skipping, time to break and distribute remaining credit
             # to nodes we couldn't parse children for.
             if stop_looking or skip:
 
                 # We haven't parsed this one yet
                 next_node.total_credit = next_node.weight
-
-                # Give all remaining credit to the node we aren't parsing
-                for node in previous:
-
-                    # We might have added and given credit to some children
-                    if node.children:
-
-                        # Redistribute credit amongst children that were > threshold
-                        dep_credit = ((1 - credit_split) * node.weight) / len(
-                            node.children
-                        )
-                        for child in node.children:
-                            child.total_credit = dep_credit
-
-                        # The node's credit is that weight minus total dep credit
-                        node.total_credit = node.weight - (
-                            dep_credit * len(node.children)
-                        )
-                    else:
-                        node.total_credit = node.weight
+                self._redistribute(previous, credit_split)
                 if stop_looking:
                     break
                 else:
                     continue
 
             # Calculate credit for each dependency and add as child
+            children = collections.Counter()
             for dep in deps:
 
                 # Haven't seen this case, but just a check
@@ -219,23 +350,354 @@ class BaseClient:
                     continue
 
                 depnode = package.get_package(manager, dep_name, use_cache=use_cache)
-                child = graph.Node(
-                    obj=depnode,
-                    weight=dep_credit,
-                    credit_split=credit_split,
-                    depth=next_node.depth + 1,
-                    min_credit=min_credit,
-                )
-                next_node.add_child(child)
-                next_nodes.append(child)
+                key = Node.get_key(depnode) if dag else None
+
+                # Nodes for a package we've already looked up share its record
+                depnode = resolved.get(depnode) or depnode
+
+                # A package we've already found gets an edge and more credit
+                if dag:
+                    if key in nodes:
+                        child = nodes[key]
+                        children[child] += 1
+                        updated = self._add_credit(
+                            next_node, child, dep_credit, expanded, credit_split
+                        )
+
+                        # Look into nodes we skipped that now have enough credit
+                        for node in updated:
+                            node_deps = skipped.get(node, [])
+                            share = (1 - credit_split) * node.weight
+                            if node_deps and share / len(node_deps) >= min_credit:
+                                del skipped[node]
+                                fetched[node] = node_deps
+                                if best_first:
+                                    popped.discard(node)
+                                else:
+                                    next_nodes.append(node)
+                            if best_first and node not in popped:
+                                heapq.heappush(
+                                    next_nodes, (-node.weight, next(order), node)
+                                )
+                        continue
+                    child = Node(
+                        obj=depnode,
+                        weight=0,
+                        credit_split=credit_split,
+                        depth=next_node.depth + 1,
+                        min_credit=min_credit,
+                    )
+                    nodes[key] = child
+                    children[child] += 1
+                    next_node.add_child(child, dep_credit)
+                else:
+                    child = Node(
+                        obj=depnode,
+                        weight=dep_credit,
+                        credit_split=credit_split,
+                        depth=next_node.depth + 1,
+                        min_credit=min_credit,
+                    )
+                    next_node.add_child(child)
+                if best_first:
+                    heapq.heappush(next_nodes, (-child.weight, next(order), child))
+                else:
+                    next_nodes.append(child)
 
                 # Store previous if we need to update weight
                 previous.append(child)
 
+            if dag:
+                expanded[next_node] = (len(deps), children)
+
+        # Credit that stays with nodes we didn't look into
+        if best_first:
+            next_nodes = [x[-1] for x in next_nodes]
+        unexpanded += [x for x in next_nodes if x not in popped]
+        root.unexpanded_credit = sum(
+            node.credit for node in set(unexpanded) if node not in expanded
+        )
+
         # Add total node count to root
         root.children_names = list(node_names)
         return root
 
+    def _exact_graph(
+        self,
+        manager,
+        name,
+        use_cache=True,
+        min_credit=0.01,
+        credit_split=0.01,
+        pkg=None,
+        resolved=None,
+        **kwargs,
+    ):
+        """
+        Calculate exact credit for each unique package of the dependency DAG.
+
+        The graph is resolved first (each package once, without credit),
+        unless we are given a frozen resolved graph.
+        """
+        if isinstance(resolved, str):
+            resolved = graph.Resolved.load(resolved)
+        if resolved is None:
+            resolved = graph.Resolved()
+        if not pkg:
+            pkg = package.get_package(manager, name, use_cache=use_cache)
+
+        # The version is looked up with the dependencies, so get the id first
+        uid = graph.Resolved.get_uid(pkg)
+        truncated = False
+        if not resolved.frozen:
+            self.check_manager(manager, use_cache)
+            truncated = self._resolve_unique(
+                manager, pkg, resolved, use_cache=use_cache, **kwargs
+            )
+
+        # E.g., a requirements.txt file underlying manager is pypi
+        if pkg.underlying_manager:
+            manager = pkg.underlying_manager.underlying_manager
+        root = graph.ExactGraph(resolved, manager).graph(
+            uid, credit_split=credit_split, min_credit=min_credit
+        )
+        root.truncated = truncated
+        return root
+
+    def _resolve_unique(
+        self,
+        manager,
+        pkg,
+        resolved,
+        use_cache=True,
+        max_depth=None,
+        max_deps=None,
+        workers=None,
+        deadline=None,
+        **kwargs,
+    ):
+        """
+        Look up dependencies for each unique package of the graph once
+        (breadth first) into resolved, without any credit. Return True if
+        we stopped because we ran out of time.
+        """
+        start = time.time()
+
+        # E.g., a requirements.txt file underlying manager is pypi
+        if pkg.underlying_manager:
+            manager = pkg.underlying_manager.underlying_manager
+
+        keys = {graph.DAGNode.get_key(pkg)}
+        next_nodes = collections.deque([graph.Node(obj=pkg, weight=0)])
+        seen = set()
+        fetched = {}
+        while next_nodes:
+            next_node = next_nodes.popleft()
+            if deadline is not None and time.time() - start > deadline:
+                logger.warning(
+                    "Deadline of %s seconds reached, stopping at %s."
+                    % (deadline, next_node.name)
+                )
+                return True
+
+            # Retrieve dependencies for the rest of this level at once
+            if workers and workers > 1 and next_node not in fetched:
+                level = [next_node] + [
+                    node
+                    for node in itertools.takewhile(
+                        lambda node: node.depth == next_node.depth, next_nodes
+                    )
+                    if node not in fetched
+                    and not (max_depth and node.depth > max_depth)
+                ]
+                if max_deps:
+                    level = level[: max(max_deps - len(seen), 1)]
+                fetched.update(
+                    self._fetch_dependencies(
+                        level,
+                        workers,
+                        resolved,
+                        deadline=start + deadline if deadline is not None else None,
+                    )
+                )
+
+            if next_node in fetched:
+                deps = fetched.pop(next_node)
+            else:
+                deps = self._get_dependencies(next_node, resolved)
+
+            # Stopping point - exceeded max depth or max deps
+            if max_depth and next_node.depth > max_depth:
+                break
+            if max_deps and len(seen) + 1 > max_deps:
+                break
+            seen.add(next_node.name)
+
+            for dep in deps:
+                dep_name = dep["name"] or dep["project_name"]
+                if not dep_name or dep_name.startswith("__"):
+                    continue
+                depnode = package.get_package(manager, dep_name, use_cache=use_cache)
+                key = graph.DAGNode.get_key(depnode)
+                if key in keys:
+                    continue
+                keys.add(key)
+                next_nodes.append(
+                    graph.Node(
+                        obj=resolved.get(depnode) or depnode,
+                        weight=0,
+                        depth=next_node.depth + 1,
+                    )
+                )
+        return False
+
+    def _add_credit(self, parent, child, weight, expanded, credit_split):
+        """
+        Give a DAG node more credit from a parent.
+
+        If the node already passed credit to its dependencies, they get their
+        share of the new credit too (and so on down), so credit doesn't depend
+        on the order we found packages in. We add up what each node gets and
+        pass it on once, in topological order. Credit that would go around a
+        cycle stays with the dependent package. We return nodes that got more
+        credit that we haven't looked into.
+        """
+        parent.add_child(child, weight)
+        order, cycles = self._sort_expanded(child, expanded)
+        pending = {child: weight}
+        updated = []
+        for node in order:
+            weight = pending.pop(node, 0)
+            if not weight:
+                continue
+            if node not in expanded:
+                updated.append(node)
+                continue
+            count, children = expanded[node]
+            share = ((1 - credit_split) * weight) / count
+            for dep, times in children.items():
+                if (node, dep) in cycles:
+                    continue
+                node.add_child(dep, share * times)
+                pending[dep] = pending.get(dep, 0) + share * times
+        return updated
+
+    def _sort_expanded(self, node, expanded):
+        """
+        Topologically sort DAG nodes under a node, going through the ones we
+        passed credit from. Edges back to a node we are still visiting are
+        cycles, and we return them to skip.
+        """
+        order = []
+        visiting = {node}
+        done = set()
+        cycles = set()
+        children = expanded[node][1] if node in expanded else {}
+        stack = [(node, iter(children))]
+        while stack:
+            current, deps = stack[-1]
+            for dep in deps:
+                if dep in visiting:
+                    cycles.add((current, dep))
+                elif dep not in done:
+                    visiting.add(dep)
+                    children = expanded[dep][1] if dep in expanded else {}
+                    stack.append((dep, iter(children)))
+                    break
+            else:
+                stack.pop()
+                visiting.remove(current)
+                done.add(current)
+                order.append(current)
+        order.reverse()
+        return order, cycles
+
+    def _redistribute(self, previous, credit_split):
+        """
+        Give all remaining credit to the nodes we aren't parsing
+        """
+        for node in previous:
+
+            # We might have added and given credit to some children
+            if node.children:
+
+                # Redistribute credit amongst children that were > threshold
+                dep_credit = ((1 - credit_split) * node.weight) / len(node.children)
+                for child in node.children:
+                    child.total_credit = dep_credit
+
+                # The node's credit is that weight minus total dep credit
+                node.total_credit = node.weight - (dep_credit * len(node.children))
+            else:
+                node.total_credit = node.weight
+
+    def _get_dependencies(self, node, resolved=None):
+        """
+        Get dependencies for a node, or an empty list if we cannot.
+
+        When we have a resolved graph, the node's package is swapped for the
+        resolved package (and we add it if we had to look it up).
+        """
+        if resolved is not None:
+            pkg = resolved.get(node.obj)
+            if pkg:
+                node.obj = pkg
+                return pkg.dependencies(return_data=True)
+
+            # We don't make requests for a frozen graph
+            if resolved.frozen:
+                logger.debug("%s is not in the resolved graph." % node.name)
+                return []
+
+        # The version is looked up with the dependencies, so get the id first
+        uid = graph.Resolved.get_uid(node.obj)
+
+        # Sometimes we know a package name / version but cannot get deps
+        try:
+            deps = node.obj.dependencies(return_data=True)
+        except Exception:
+            deps = []
+        if resolved is not None:
+            node.obj = resolved.add(uid, node.obj, deps)
+        return deps
+
+    def _fetch_dependencies(self, nodes, workers, resolved=None, deadline=None):
+        """
+        Retrieve dependencies for a list of nodes with a pool of workers.
+
+        Nodes for the same package are given to the same worker, so the
+        second lookup is a cache hit instead of a second request. Nodes a
+        worker gets to after the deadline (a time) are not retrieved.
+        """
+        groups = {}
+        for node in nodes:
+            groups.setdefault((node.obj.manager, node.name), []).append(node)
+
+        def fetch(group):
+            if deadline is not None and time.time() > deadline:
+                return []
+            return [(node, self._get_dependencies(node, resolved)) for node in group]
+
+        fetched = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(fetch, groups.values()):
+                fetched.update(result)
+        return fetched
+
+    def resolve(self, *args, **kwargs):
+        """
+        Resolve the dependency graph for a package, without credit.
+
+        The result can be saved, and then given back to graph, credit, or badge
+        (as resolved) to calculate credit with other parameters, without any
+        requests. Resolve with the smallest min_credit and credit_split you
+        intend to use, as packages we didn't look up have no dependencies.
+        """
+        resolved = graph.Resolved()
+        self._graph(*args, resolved=resolved, **kwargs)
+        resolved.frozen = True
+        return resolved
+
     def credit(self, *args, **kwargs):
         """
         Get the credit root node, then do additional graph parsing.
@@ -243,10 +705,10 @@ class BaseClient:
         root = self._graph(*args, **kwargs)
         return results.Tree(root)
 
-    def package(self, manager, name, use_cache=True):
+    def package(self, manager, name, use_cache=True, full=False):
         """
-        Lookup a package in a specific package manager
+        Lookup a package in a specific package manager (full for every field)
         """
         self.check_manager(manager, use_cache)
         pkg = package.get_package(manager, name, use_cache=use_cache)
-        return pkg.info()
+        return pkg.info(full=full)
@@ -0,0 +1,560 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import contextlib
+import hashlib
+import importlib
+import json
+import os
+import time
+
+import citelang.main.http as http
+import citelang.main.result as results
+import citelang.main.settings as settings
+import citelang.utils as utils
+from citelang.logger import logger
+
+from .backend import Backend, counts
+from .bundle import BundleBackend, write_bundle
+from .lock import KeyLock, get_lock
+from .memory import MemoryCache
+
+# Cache backends that can be selected with cache_backend in settings
+backends = {
+    "filesystem": "citelang.main.cache.filesystem.FilesystemBackend",
+    "sqlite": "citelang.main.cache.sqlite.SQLiteBackend",
+    "lmdb": "citelang.main.cache.lmdb.LMDBBackend",
+}
+
+# With cache_dedup, an entry is a pointer (with this key) to a blob of data
+blob_key = "$blob"
+
+
+def get_backend(name=None, cache_dir=None):
+    """
+    Get a cache backend by name (defaults to cache_backend in settings).
+
+    Backends are only imported when we use them, as some need extra libraries.
+    """
+    name = name or settings.cfg.cache_backend or "filesystem"
+    if name not in backends:
+        logger.exit(
+            "%s is not a known cache_backend, choices are: %s"
+            % (name, ", ".join(backends))
+        )
+    module, classname = backends[name].rsplit(".", 1)
+    return getattr(importlib.import_module(module), classname)(cache_dir=cache_dir)
+
+
+class Cache:
+    """
+    The cache controls saving and loading citelang package content. We should
+    be able to load (and use) a cache anywhere.
+
+    Results are kept in memory for the session (up to a budget, least
+    recently used first out), and in a backend (by default a json file for
+    each under the cache_dir) across sessions.
+    """
+
+    _cache = MemoryCache(
+        max_entries=settings.cfg.memory_cache_max_entries,
+        max_bytes=settings.cfg.memory_cache_max_bytes,
+    )
+
+    # Bundles we have opened (memory mapped) by path
+    _bundles = {}
+
+    def __init__(self, backend=None):
+        if backend is None or isinstance(backend, str):
+            backend = get_backend(backend)
+        self.backend = backend
+        self.recorded = None
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "[citelang-cache]"
+
+    def clear(self, force=False):
+        """
+        Clear the cache (with confirmation).
+        """
+        if not force and not utils.confirm_action(
+            "Are you sure you want to clear the cache? "
+        ):
+            return
+        self.backend.clear()
+
+    def set(self, name, result):
+        """
+        Given a result, cache if the user has cache enabled.
+        """
+        if settings.cfg.disable_cache is True:
+            return
+
+        # Ensure cache directory exists
+        utils.mkdir_p(settings.cfg.cache_dir)
+
+        # Don't write empty data
+        if not result.data:
+            logger.warning(
+                "No data found for result, not writing %s" % self.get_cache_name(name)
+            )
+            return
+
+        # Only keep what we use (e.g., not every field of every version)
+        data = result.data
+        if settings.cfg.cache_slim is not False and result.endpoint:
+            data = result.endpoint.slim(data)
+
+        blob = self.store(name, data)
+        self.record(name)
+
+        # If we are using the memory cache, save to it. If we end in a version
+        # (e.g., package/pypi/numpy/1.22.3) the name without is an alias, and
+        # for a blob (for every name with the same data) so is the name
+        if not settings.cfg.disable_memory_cache:
+            aliases = [name] if blob else []
+            if name.count("/") == 3:
+                aliases.append(name.rsplit("/", 1)[0])
+            self._cache.set(blob or name, data, alias=aliases)
+
+    def store(self, name, data, updated=None):
+        """
+        Write data for a name to the backend. With cache_dedup, the data is
+        a blob named by its hash (written once for the same data under any
+        name, e.g., with and without a version) and the name points to it.
+        """
+        if settings.cfg.cache_dedup is False:
+            self.backend.set(name, data, updated)
+            return
+        # The standard json (not orjson) so the hash is the same everywhere
+        content = json.dumps(data, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        blob = "blobs/%s/%s" % (digest[:2], digest)
+        if self.backend.updated(blob) is None:
+            self.backend.set(blob, data)
+        self.backend.set(name, {blob_key: blob}, updated)
+        self.record(blob)
+        return blob
+
+    def load(self, source, name):
+        """
+        Load data for a name from a backend (or bundle), and keep it in
+        memory. If it points to a blob, we load the blob from memory (so it
+        is parsed once for every name that points to it) or the same backend.
+        """
+        data = source.get(name)
+        blob = get_blob(data)
+        if blob:
+            self.record(blob)
+            data = self._cache.get(blob)
+            if data is None:
+                data = source.get(blob)
+        if data is not None and not settings.cfg.disable_memory_cache:
+            self._cache.set(blob or name, data, alias=name if blob else None)
+        return data
+
+    def get_cache_name(self, name):
+        """
+        Return a cache entry (e.g., a json file for the filesystem)
+        """
+        return self.backend.get_cache_name(name)
+
+    def is_empty(self, name):
+        """
+        Given a package name, determine if it's empty (the endpoint tried and
+        no result) so we don't try again, until it is older than the
+        cache_ttl for empty markers.
+        """
+        updated = self.backend.marked_empty(name)
+        if updated is None:
+            for bundle in self.bundles:
+                if bundle.marked_empty(name) is not None:
+                    break
+            else:
+                counts["negative_misses"] += 1
+                return False
+        else:
+            ttl = (settings.cfg.cache_ttl or {}).get("empty")
+            if ttl is not None and time.time() - updated > ttl * 86400:
+                counts["negative_misses"] += 1
+                return False
+        counts["negative_hits"] += 1
+        self.record(name, empty=True)
+        return True
+
+    def mark_empty(self, name):
+        """
+        Given a package name, mark it empty to indicate the manager doesn't
+        have it.
+        """
+        self.backend.mark_empty(name)
+
+    def get(self, name, endpoint=None):
+        """
+        Given a cache name (typically matching the endpoint) retrieve if exists.
+        If provided and endpoint, wrap the result with the endpoint. Otherwise,
+        return the json result.
+        """
+        # First effort - get from memory
+        data = self._cache.get(name)
+        if data is not None:
+            counts["memory_hits"] += 1
+            self.record(name)
+            self.record(self._cache.aliases.get(name, name))
+            return data
+        if not settings.cfg.disable_memory_cache:
+            counts["memory_misses"] += 1
+
+        # Second effort - the backend (e.g., evicted from memory) if not stale
+        if self.is_stale(name):
+            counts["stale"] += 1
+            return
+        data = self.load(self.backend, name)
+        counts["disk_hits" if data else "disk_misses"] += 1
+        if data:
+            self.backend.touch(name)
+
+        # Third effort - a bundle (read only, so never stale)
+        for bundle in self.bundles:
+            if data:
+                break
+            data = self.load(bundle, name)
+            counts["bundle_hits" if data else "bundle_misses"] += 1
+
+        if data:
+            self.record(name)
+        if data and endpoint:
+            return results.Table(data, endpoint)
+        elif data:
+            return data
+
+    @property
+    def bundles(self):
+        """
+        Bundles (from cache_bundles in settings) to read from after the backend
+        """
+        bundles = []
+        for path in settings.cfg.cache_bundles or []:
+            if path not in self._bundles:
+                self._bundles[path] = BundleBackend(path)
+            bundles.append(self._bundles[path])
+        return bundles
+
+    def record(self, name, empty=False):
+        """
+        If we are recording, keep a name we used (or found empty)
+        """
+        if self.recorded is not None:
+            self.recorded["empty" if empty else "entries"].add(name)
+
+    @contextlib.contextmanager
+    def recording(self):
+        """
+        Record the names we use (e.g., to resolve a graph), to export them.
+        """
+        self.recorded = {"entries": set(), "empty": set()}
+        try:
+            yield self.recorded
+        finally:
+            self.recorded = None
+
+    def is_stale(self, name):
+        """
+        Determine if an entry is older than the cache_ttl (in days) for its
+        type (e.g., package) and we are refreshing stale entries.
+        """
+        if not settings.cfg.refresh_stale:
+            return False
+        ttl = (settings.cfg.cache_ttl or {}).get(name.split("/", 1)[0])
+        if ttl is None:
+            return False
+        updated = self.backend.updated(name)
+        return updated is not None and time.time() - updated > ttl * 86400
+
+    def lock(self, name):
+        """
+        Lock a name (between threads and processes) while we retrieve it.
+        """
+        if settings.cfg.disable_cache is True:
+            return contextlib.nullcontext()
+        return get_lock(self.backend.lock_path)(name)
+
+    def fetch(self, name, url, endpoint=None, retrieve=None):
+        """
+        Retrieve data for a url (or from retrieve, e.g., a custom package
+        manager) and cache it under a name. Only one process (or thread)
+        retrieves a name at once, and the others wait for it.
+        """
+        with self.lock(name):
+
+            # Another process may have retrieved it while we waited
+            data = self.get(name)
+            if data:
+                return data
+            counts["fetches"] += 1
+            data = retrieve() if retrieve else self._fetch(name, url)
+            if data:
+                self.set(name, results.Result(data, endpoint))
+        return data
+
+    def _fetch(self, name, url):
+        """
+        If we have data for a name (e.g., it is stale) and an etag or last
+        modified time, we ask the server to only send it if it changed.
+        """
+        validators = None
+        if settings.cfg.disable_cache is not True:
+            validators = self.backend.get("validators/%s" % name)
+        if validators and self.backend.updated(name) is not None:
+            data, updated = http.get_conditional(url, **validators)
+            if data is None:
+                logger.info("%s has not changed." % name)
+                data = self.load(self.backend, name)
+        else:
+            data, updated = http.get_conditional(url)
+
+        # Save the etag and last modified to check with next time
+        updated = {k: v for k, v in updated.items() if v}
+        if updated and data and settings.cfg.disable_cache is not True:
+            self.backend.set("validators/%s" % name, dict(validators or {}, **updated))
+        return data
+
+    def iterate(self, empty=False):
+        """
+        Yield (name, updated) for each entry (not blobs), or each empty marker
+        """
+        for name, updated in self.backend.iterate(empty=empty):
+            if not name.startswith("blobs/"):
+                yield name, updated
+
+    def stats(self):
+        """
+        Counts and size of entries in the backend, the memory cache, and
+        counts for the session (e.g., hits for each tier)
+        """
+        stats = {
+            "backend": self.backend.name,
+            "memory": self._cache.stats(),
+            "counts": dict(counts),
+        }
+        stats.update(self.backend.stats())
+        return stats
+
+    def usage(self):
+        """
+        Count entries and their size (as stored) by endpoint and manager,
+        e.g., {"package": {"pypi": {"entries": 10, "size": 20000}}}
+        """
+        usage = {}
+        for name, size in self.backend.sizes():
+            endpoint, manager = get_endpoint_manager(name)
+            entry = usage.setdefault(endpoint, {}).setdefault(
+                manager, {"entries": 0, "size": 0}
+            )
+            entry["entries"] += 1
+            entry["size"] += size
+        return usage
+
+    def export(self, path, recorded=None):
+        """
+        Write entries and empty markers (only those recorded, if given) to a
+        bundle, and return the number of each.
+        """
+        recorded = recorded or {}
+        return write_bundle(
+            path, self.backend, recorded.get("entries"), recorded.get("empty")
+        )
+
+    def prune(self, max_size=None, older_than=None, managers=None, dry_run=False):
+        """
+        Remove entries (for managers, if given) not used in older_than days,
+        and then the least recently used until they are at most max_size
+        bytes. A package cached with and without a version with the same
+        data (from before cache_dedup) is stored once, with both names
+        pointing to it, and we remove validators and blobs for entries we
+        don't have. Return counts of what we removed (or would).
+        """
+        duplicates = self.alias_duplicates(managers, dry_run)
+        sizes = dict(self.backend.sizes())
+        accessed = self.backend.accessed()
+        removed = {}
+
+        names = [
+            name
+            for name in sorted(sizes, key=lambda x: accessed.get(x, 0))
+            if not name.startswith(("validators/", "blobs/"))
+            and (not managers or get_endpoint_manager(name)[1] in managers)
+        ]
+
+        # The entries that point to each blob (pointers are small)
+        pointers = {}
+        refs = {}
+        for name in sizes:
+            if name.startswith(("validators/", "blobs/")) or sizes[name] > 256:
+                continue
+            blob = get_blob(self.backend.get(name))
+            if blob:
+                pointers[name] = blob
+                refs.setdefault(blob, set()).add(name)
+
+        def remove(name, reason):
+            """
+            Remove an entry (and its validators, and blob if nothing else
+            points to it) and return the size we free.
+            """
+            if name in removed:
+                return 0
+            removed[name] = reason
+            freed = sizes[name]
+            validators = "validators/%s" % name
+            if validators in sizes:
+                removed.setdefault(validators, reason)
+            blob = pointers.get(name)
+            if blob in refs:
+                refs[blob].discard(name)
+                if not refs[blob] and blob in sizes:
+                    removed.setdefault(blob, reason)
+                    freed += sizes[blob]
+            return freed
+
+        if older_than is not None:
+            cutoff = time.time() - older_than * 86400
+            for name in names:
+                if name not in removed and accessed.get(name, 0) < cutoff:
+                    remove(name, "expired")
+
+        if max_size is not None:
+            blobs = {pointers[x] for x in names if x in pointers and x not in removed}
+            total = sum(sizes[x] for x in names if x not in removed)
+            total += sum(sizes[x] for x in blobs if x in sizes and x not in removed)
+            for name in names:
+                if total <= max_size:
+                    break
+                total -= remove(name, "evicted")
+
+        # Validators for an entry we don't have, pointers to a blob we don't
+        # have, and blobs nothing points to
+        for name in sizes:
+            if managers and get_endpoint_manager(name)[1] not in managers:
+                continue
+            if (
+                (name.startswith("validators/") and name.split("/", 1)[1] not in sizes)
+                or (name in pointers and pointers[name] not in sizes)
+                or (name.startswith("blobs/") and not refs.get(name))
+            ):
+                removed.setdefault(name, "orphans")
+
+        if not dry_run:
+            with self.backend.batch():
+                for name in removed:
+                    self.backend.delete(name)
+                    self._cache.delete(name)
+
+        stats = {"entries": len(removed), "size": sum(sizes[x] for x in removed)}
+        for reason in ["expired", "evicted", "orphans"]:
+            stats[reason] = list(removed.values()).count(reason)
+        stats["duplicates"] = duplicates
+        stats["remaining"] = sum(sizes.values()) - stats["size"]
+        return stats
+
+    def alias_duplicates(self, managers=None, dry_run=False):
+        """
+        Store the data for a package cached with and without a version (e.g.,
+        package/pypi/requests and package/pypi/requests/2.27.1) once if they
+        are the same, so both names still find it. Return the number of
+        names that we point (or would point) to a blob.
+        """
+        if settings.cfg.cache_dedup is False:
+            return 0
+        names = {
+            name
+            for name, _ in self.iterate()
+            if name.startswith("package/")
+            and (not managers or get_endpoint_manager(name)[1] in managers)
+        }
+        aliased = {}
+        for name in sorted(names):
+            unversioned = name.rsplit("/", 1)[0]
+            if name.count("/") != 3 or unversioned not in names:
+                continue
+            entries = {x: self.backend.get(x) for x in [name, unversioned]}
+            if all(get_blob(x) for x in entries.values()):
+                continue
+            data = []
+            for entry in entries.values():
+                blob = get_blob(entry)
+                data.append(self.backend.get(blob) if blob else entry)
+            if data[0] == data[1]:
+                for key, entry in entries.items():
+                    if not get_blob(entry):
+                        aliased[key] = data[0]
+
+        if not dry_run:
+            with self.backend.batch():
+                for name, data in aliased.items():
+                    self.store(name, data, self.backend.updated(name))
+        return len(aliased)
+
+    def migrate(self, source, merge=False):
+        """
+        Import all entries and empty markers from another backend (e.g., a
+        directory cache or a bundle) and return the number of each. If we
+        merge, we keep entries we have that are as new as the source.
+        """
+        if isinstance(source, str):
+            source = get_backend("filesystem", cache_dir=source)
+        entries = 0
+        empty = 0
+        with self.backend.batch():
+            for name, updated in source.iterate():
+                if merge and not is_newer(updated, self.backend.updated(name)):
+                    continue
+                data = source.get(name)
+                if data:
+                    self.backend.set(name, data, updated)
+                    entries += 1
+            for name, updated in source.iterate(empty=True):
+                if merge and not is_newer(updated, self.backend.marked_empty(name)):
+                    continue
+                self.backend.mark_empty(name, updated)
+                empty += 1
+        return entries, empty
+
+
+def get_endpoint_manager(name):
+    """
+    Get the endpoint and manager for a name, e.g., package/pypi/requests is
+    package and pypi, and package_managers has no manager.
+    """
+    parts = name.split("/")
+    if parts[0] == "blobs":
+        return "blobs", None
+    if parts[0] == "validators":
+        return "validators", parts[2] if len(parts) > 2 else None
+    return parts[0], parts[1] if len(parts) > 1 else None
+
+
+def get_blob(data):
+    """
+    Get the blob an entry points to, if it is a pointer
+    """
+    if isinstance(data, dict) and len(data) == 1:
+        return data.get(blob_key)
+
+
+def is_newer(updated, current):
+    """
+    Determine if an updated time is newer than the current (if we have one)
+    """
+    return current is None or (updated or 0) > current
+
+
+def init_cache():
+    return Cache()
+
+
+cache = init_cache()
@@ -0,0 +1,136 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import collections
+import contextlib
+import os
+import time
+
+import citelang.main.settings as settings
+
+from . import encoding
+
+# Counts for the session (e.g., hits for each tier, bytes read and written)
+counts = collections.Counter()
+
+
+class Backend:
+    """
+    A cache backend stores json data (and empty markers) by name, e.g.,
+    package/pypi/numpy/1.22.3. Data is always the loaded json (a dict or
+    list), and updated is a timestamp (seconds since the epoch). Data is
+    stored encoded with the cache_encoding and cache_compression settings.
+    """
+
+    name = None
+
+    def __init__(self, cache_dir=None):
+        self._cache_dir = cache_dir
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "[citelang-cache-backend-%s]" % self.name
+
+    @property
+    def cache_dir(self):
+        """
+        The cache directory, from settings unless we were given one
+        """
+        return self._cache_dir or settings.cfg.cache_dir
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.cache_dir, "cache.lock")
+
+    def get_cache_name(self, name):
+        return name
+
+    def encode(self, data):
+        content = encoding.encode(
+            data, settings.cfg.cache_encoding, settings.cfg.cache_compression
+        )
+        counts["bytes_written"] += len(content)
+        return content
+
+    def decode(self, content):
+        start = time.time()
+        data = encoding.decode(content)
+        counts["decode_seconds"] += time.time() - start
+        counts["bytes_read"] += len(content)
+        return data
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Group many writes (e.g., a migration) together, if the backend can
+        """
+        yield
+
+    def get(self, name):
+        """
+        Get data for a name, or None if we don't have it
+        """
+        raise NotImplementedError
+
+    def set(self, name, data, updated=None):
+        raise NotImplementedError
+
+    def updated(self, name):
+        """
+        Get the time an entry was updated, or None if we don't have it
+        """
+        raise NotImplementedError
+
+    def touch(self, name):
+        """
+        Record that an entry was used (to prune the least recently used first)
+        """
+        pass
+
+    def accessed(self):
+        """
+        Return the time each entry was last used (or updated, if later)
+        """
+        return dict(self.iterate())
+
+    def delete(self, name):
+        raise NotImplementedError
+
+    def is_empty(self, name):
+        """
+        Determine if a name is marked empty (the endpoint had no result)
+        """
+        return self.marked_empty(name) is not None
+
+    def marked_empty(self, name):
+        """
+        Get the time a name was marked empty, or None if it isn't
+        """
+        raise NotImplementedError
+
+    def mark_empty(self, name, updated=None):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def iterate(self, empty=False):
+        """
+        Yield (name, updated) for each entry, or each empty marker
+        """
+        raise NotImplementedError
+
+    def stats(self):
+        """
+        Return counts of entries and empty markers, and the size of entries
+        """
+        raise NotImplementedError
+
+    def sizes(self):
+        """
+        Yield (name, size) for each entry, the size as stored
+        """
+        raise NotImplementedError
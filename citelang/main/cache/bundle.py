@@ -0,0 +1,150 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import gzip
+import mmap
+import os
+import struct
+
+import citelang.main.settings as settings
+import citelang.utils as utils
+from citelang.logger import logger
+
+from . import encoding
+from .backend import Backend
+
+# A bundle starts with the magic, then each entry (encoded and compressed on
+# its own), then the index (gzipped json) and a footer with where it is
+magic = b"CITELANG-BUNDLE1"
+footer = struct.Struct(">QQ%ss" % len(magic))
+
+
+class BundleBackend(Backend):
+    """
+    A read only cache in one bundle file (e.g., exported for offline use).
+
+    We load the index of entries and empty markers, and memory map the file
+    to read an entry when we need it, so a bundle on a mounted volume is
+    never unpacked.
+    """
+
+    name = "bundle"
+
+    def __init__(self, path):
+        super().__init__(cache_dir=os.path.dirname(os.path.abspath(path)))
+        self.path = path
+        self._mmap = None
+        self.index = None
+
+    def __str__(self):
+        return "[citelang-cache-bundle:%s]" % self.path
+
+    def open(self):
+        """
+        Memory map the bundle and load the index, once
+        """
+        if self._mmap is not None:
+            return self._mmap
+        if not os.path.exists(self.path):
+            logger.exit("Cache bundle %s does not exist." % self.path)
+        with open(self.path, "rb") as fd:
+            mapped = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < len(magic) + footer.size or mapped[: len(magic)] != magic:
+            logger.exit("%s is not a citelang cache bundle." % self.path)
+        start, length, end = footer.unpack(mapped[-footer.size :])
+        if end != magic:
+            logger.exit("Cache bundle %s is incomplete." % self.path)
+        self.index = utils.loads_json(gzip.decompress(mapped[start : start + length]))
+        self._mmap = mapped
+        return mapped
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def get_cache_name(self, name):
+        return "%s:%s" % (self.path, name)
+
+    def get(self, name):
+        mapped = self.open()
+        entry = self.index["entries"].get(name)
+        if entry:
+            offset, length, _ = entry
+            return self.decode(mapped[offset : offset + length])
+
+    def updated(self, name):
+        self.open()
+        entry = self.index["entries"].get(name)
+        if entry:
+            return entry[2]
+
+    def marked_empty(self, name):
+        self.open()
+        return self.index["empty"].get(name)
+
+    def iterate(self, empty=False):
+        self.open()
+        if empty:
+            yield from self.index["empty"].items()
+            return
+        for name, entry in self.index["entries"].items():
+            yield name, entry[2]
+
+    def stats(self):
+        self.open()
+        return {
+            "entries": len(self.index["entries"]),
+            "empty": len(self.index["empty"]),
+            "size": os.path.getsize(self.path),
+        }
+
+    def sizes(self):
+        self.open()
+        for name, entry in self.index["entries"].items():
+            yield name, entry[1]
+
+    def set(self, name, data, updated=None):
+        logger.exit("A cache bundle is read only, import it to add to it.")
+
+    def mark_empty(self, name, updated=None):
+        logger.exit("A cache bundle is read only, import it to add to it.")
+
+    def delete(self, name):
+        logger.exit("A cache bundle is read only, export it again to remove from it.")
+
+    def clear(self):
+        logger.exit("A cache bundle is read only, delete it to remove it.")
+
+
+def write_bundle(path, backend, names=None, empty=None):
+    """
+    Write entries and empty markers from a backend (only names and empty,
+    if given) to a bundle, and return the number of each.
+    """
+    compression = settings.cfg.cache_compression or "gzip"
+    index = {"entries": {}, "empty": {}}
+    utils.mkdir_p(os.path.dirname(os.path.abspath(path)))
+    tmp = "%s.%s.tmp" % (path, os.getpid())
+    with open(tmp, "wb") as fd:
+        fd.write(magic)
+        for name, updated in backend.iterate():
+            if names is not None and name not in names:
+                continue
+            data = backend.get(name)
+            if not data:
+                continue
+            content = encoding.encode(data, settings.cfg.cache_encoding, compression)
+            index["entries"][name] = [fd.tell(), len(content), updated]
+            fd.write(content)
+        for name, updated in backend.iterate(empty=True):
+            if empty is None or name in empty:
+                index["empty"][name] = updated
+
+        content = gzip.compress(utils.dumps_json(index))
+        start = fd.tell()
+        fd.write(content)
+        fd.write(footer.pack(start, len(content), magic))
+    os.replace(tmp, path)
+    return len(index["entries"]), len(index["empty"])
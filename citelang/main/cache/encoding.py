@@ -0,0 +1,77 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+# Encode cache entries as compact json (or msgpack), optionally compressed.
+# We detect how an entry was written from its first bytes, so entries
+# written with other settings (or pretty printed json) are always readable.
+
+import gzip
+
+import citelang.utils as utils
+from citelang.logger import logger
+
+encodings = ["json", "msgpack"]
+compressions = ["gzip", "zstd"]
+
+# Magic numbers at the start of compressed content
+gzip_magic = b"\x1f\x8b"
+zstd_magic = b"\x28\xb5\x2f\xfd"
+
+
+def get_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        logger.exit(
+            "msgpack is needed for the msgpack cache encoding. pip install citelang[msgpack]."
+        )
+    return msgpack
+
+
+def get_zstd():
+    try:
+        import zstandard
+    except ImportError:
+        logger.exit(
+            "zstandard is needed for zstd cache compression. pip install citelang[zstd]."
+        )
+    return zstandard
+
+
+def encode(data, encoding=None, compression=None):
+    """
+    Encode data to bytes, minified json unless we are asked for msgpack
+    """
+    if encoding == "msgpack":
+        content = get_msgpack().packb(data, use_bin_type=True)
+    else:
+        content = utils.dumps_json(data)
+
+    if compression == "gzip":
+        content = gzip.compress(content, compresslevel=6)
+    elif compression == "zstd":
+        content = get_zstd().ZstdCompressor(level=3).compress(content)
+    return content
+
+
+def decode(content):
+    """
+    Decode bytes (or a string) written with any encoding and compression
+    """
+    if isinstance(content, str):
+        return utils.loads_json(content)
+
+    if content[:2] == gzip_magic:
+        content = gzip.decompress(content)
+    elif content[:4] == zstd_magic:
+        content = get_zstd().ZstdDecompressor().decompress(content)
+
+    # Json starts with whitespace, an object or a list, msgpack doesn't
+    if is_json(content):
+        return utils.loads_json(content)
+    return get_msgpack().unpackb(content, raw=False)
+
+
+def is_json(content):
+    return content[:1] in [b"{", b"[", b" ", b"\n", b"\t", b"\r", b'"']
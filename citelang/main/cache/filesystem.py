@@ -0,0 +1,252 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import os
+import shutil
+import threading
+import time
+
+import citelang.utils as utils
+from citelang.logger import logger
+
+from .backend import Backend
+from .lock import get_lock
+
+
+class FilesystemBackend(Backend):
+    """
+    A json file for each entry, e.g., cache_dir/package/pypi/numpy/1.22.3.json
+    The file is compact json unless we are using another cache_encoding or
+    cache_compression.
+
+    Empty markers are lines (the time and name) appended to one index,
+    cache_dir/empty.log, that we load once into memory.
+    """
+
+    name = "filesystem"
+
+    def __init__(self, cache_dir=None):
+        super().__init__(cache_dir)
+        self._empty = None
+        self._empty_path = None
+        self._lock = threading.Lock()
+
+    def get_cache_name(self, name):
+        """
+        Return a json cache entry.
+        """
+        return os.path.join(self.cache_dir, "%s.json" % name)
+
+    @property
+    def empty_index(self):
+        return os.path.join(self.cache_dir, "empty.log")
+
+    def load_empty(self):
+        """
+        Load the empty markers (name and time marked) for the cache directory
+        once, and then add to them as we mark more.
+        """
+        if self._empty is not None:
+            return self._empty
+
+        path = self.empty_index
+        with self._lock:
+            if self._empty is not None:
+                return self._empty
+
+            empty = {}
+            if os.path.exists(path):
+                empty, lines = self._read_empty(path)
+
+                # Names marked again (and lines we cannot read) are dropped
+                if lines > 2 * len(empty) + 1000:
+                    self._write_empty(path, empty)
+
+            # We used to write an .empty file for each, import them once
+            elif os.path.exists(self.cache_dir):
+                empty = self._import_empty(path)
+
+            self._empty = empty
+            self._empty_path = path
+            return empty
+
+    def _read_empty(self, path):
+        """
+        Read empty markers from the index, and the number of lines read.
+        """
+        empty = {}
+        lines = 0
+        with open(path, "r") as fd:
+            for line in fd:
+                lines += 1
+                updated, _, name = line.rstrip("\n").partition("\t")
+                try:
+                    empty[name] = float(updated)
+                except ValueError:
+                    continue
+        return empty, lines
+
+    def _import_empty(self, path):
+        """
+        Import .empty files into the index, and remove them. Another process
+        can be doing the same, so we hold a lock and skip names it added.
+        """
+        with get_lock(self.lock_path)("empty.log"):
+            empty = {}
+            if os.path.exists(path):
+                empty, _ = self._read_empty(path)
+
+            paths = []
+            for root, _, files in os.walk(self.cache_dir):
+                for filename in files:
+                    if filename.endswith(".empty"):
+                        paths.append(os.path.join(root, filename))
+
+            added = False
+            for filename in paths:
+                name = os.path.relpath(filename, self.cache_dir)[:-6]
+                name = name.replace(os.sep, "/")
+                if name in empty:
+                    continue
+                try:
+                    empty[name] = os.path.getmtime(filename)
+                    added = True
+                except FileNotFoundError:
+                    continue
+
+            # An empty index means we don't look again
+            if added or not os.path.exists(path):
+                self._write_empty(path, empty)
+            for filename in paths:
+                try:
+                    os.remove(filename)
+                except FileNotFoundError:
+                    pass
+        return empty
+
+    def _write_empty(self, path, empty):
+        """
+        Write all empty markers to the index at once.
+        """
+        utils.mkdir_p(os.path.dirname(path))
+        tmp = "%s.%s.tmp" % (path, os.getpid())
+        with open(tmp, "w") as fd:
+            fd.writelines(
+                "%r\t%s\n" % (updated, name) for name, updated in empty.items()
+            )
+        os.replace(tmp, path)
+
+    def get(self, name):
+        path = self.get_cache_name(name)
+        if not os.path.exists(path):
+            return
+
+        # Load the cache, return as a result if it exists.
+        # If there is an error loading it, assume corrupt (and regnerate)
+        data = None
+        try:
+            data = self.decode(self.read(path))
+        except Exception:
+            logger.warning(f"Cache entry {path} is corrupt, removing.")
+            os.remove(path)
+        return data
+
+    def read(self, path):
+        """
+        Read an entry without changing the time it was accessed, so only
+        touch (when the cache uses it) does.
+        """
+        try:
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOATIME", 0))
+        except PermissionError:
+            fd = os.open(path, os.O_RDONLY)
+        with os.fdopen(fd, "rb") as handle:
+            return handle.read()
+
+    def set(self, name, data, updated=None):
+        # prepare the path (e.g., cache_dir/package_managers.json)
+        path = self.get_cache_name(name)
+
+        # We can't predict nesting, so always make directory
+        utils.mkdir_p(os.path.dirname(path))
+
+        # Write to a temporary file and rename, so a reader never sees part
+        tmp = "%s.%s.%s.tmp" % (path, os.getpid(), threading.get_ident())
+        try:
+            with open(tmp, "wb") as fd:
+                fd.write(self.encode(data))
+            if updated:
+                os.utime(tmp, (updated, updated))
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def updated(self, name):
+        path = self.get_cache_name(name)
+        if os.path.exists(path):
+            return os.path.getmtime(path)
+
+    def touch(self, name):
+        # The access time, keeping the modified time (when it was updated)
+        path = self.get_cache_name(name)
+        try:
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        except OSError:
+            pass
+
+    def accessed(self):
+        accessed = {}
+        for name, _ in self.iterate():
+            try:
+                stat = os.stat(self.get_cache_name(name))
+            except OSError:
+                continue
+            accessed[name] = max(stat.st_atime, stat.st_mtime)
+        return accessed
+
+    def delete(self, name):
+        path = self.get_cache_name(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def marked_empty(self, name):
+        return self.load_empty().get(name)
+
+    def mark_empty(self, name, updated=None):
+        empty = self.load_empty()
+        updated = updated or time.time()
+        utils.mkdir_p(os.path.dirname(self._empty_path))
+        with self._lock:
+            with open(self._empty_path, "a") as fd:
+                fd.write("%r\t%s\n" % (updated, name))
+            empty[name] = updated
+
+    def clear(self):
+        if os.path.exists(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
+        self._empty = None
+
+    def iterate(self, empty=False):
+        if empty:
+            yield from list(self.load_empty().items())
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.cache_dir)[:-5]
+                yield name.replace(os.sep, "/"), os.path.getmtime(path)
+
+    def stats(self):
+        sizes = [size for _, size in self.sizes()]
+        empty = len(self.load_empty())
+        return {"entries": len(sizes), "empty": empty, "size": sum(sizes)}
+
+    def sizes(self):
+        for name, _ in self.iterate():
+            path = self.get_cache_name(name)
+            if os.path.exists(path):
+                yield name, os.path.getsize(path)
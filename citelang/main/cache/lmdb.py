@@ -0,0 +1,166 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import os
+import struct
+import threading
+import time
+
+import citelang.utils as utils
+from citelang.logger import logger
+
+from .backend import Backend
+
+try:
+    import lmdb
+except ImportError:
+    logger.exit(
+        "lmdb is needed for the lmdb cache backend. pip install citelang[lmdb]."
+    )
+
+# Each value starts with the time it was updated
+header = struct.Struct(">d")
+
+
+class LMDBBackend(Backend):
+    """
+    A memory-mapped key value store (LMDB) in the lmdb directory of the
+    cache directory. Readers don't block, and there is one writer at a time.
+    """
+
+    name = "lmdb"
+
+    # The maximum size of the database (the file grows as it is used)
+    map_size = 2**34
+
+    _envs = {}
+    _lock = threading.Lock()
+
+    @property
+    def db_path(self):
+        return os.path.join(self.cache_dir, "lmdb")
+
+    @property
+    def env(self):
+        """
+        Get the environment for the database (one per process)
+        """
+        path = self.db_path
+        with self._lock:
+            if path not in self._envs:
+                utils.mkdir_p(path)
+                env = lmdb.open(path, map_size=self.map_size, max_dbs=3)
+                self._envs[path] = (
+                    env,
+                    env.open_db(b"entries"),
+                    env.open_db(b"empty"),
+                    env.open_db(b"accessed"),
+                )
+        return self._envs[path]
+
+    def close(self):
+        with self._lock:
+            env = self._envs.pop(self.db_path, None)
+        if env:
+            env[0].close()
+
+    def get_cache_name(self, name):
+        return "%s:%s" % (self.db_path, name)
+
+    def _get(self, name, empty=False):
+        env, entries, empties, _ = self.env
+        with env.begin(db=empties if empty else entries, buffers=True) as txn:
+            value = txn.get(name.encode("utf-8"))
+            return bytes(value) if value is not None else None
+
+    def _put(self, name, content, updated=None, empty=False):
+        env, entries, empties, _ = self.env
+        value = header.pack(updated or time.time()) + content
+        with env.begin(db=empties if empty else entries, write=True) as txn:
+            txn.put(name.encode("utf-8"), value)
+
+    def get(self, name):
+        value = self._get(name)
+        if value is None:
+            return
+        try:
+            return self.decode(value[header.size :])
+        except Exception:
+            logger.warning(f"Cache entry {name} is corrupt, removing.")
+            env, entries, _, _ = self.env
+            with env.begin(db=entries, write=True) as txn:
+                txn.delete(name.encode("utf-8"))
+
+    def set(self, name, data, updated=None):
+        self._put(name, self.encode(data), updated)
+
+    def updated(self, name):
+        value = self._get(name)
+        if value is not None:
+            return header.unpack(value[: header.size])[0]
+
+    def touch(self, name):
+        env, _, _, accessed = self.env
+        with env.begin(db=accessed, write=True) as txn:
+            txn.put(name.encode("utf-8"), header.pack(time.time()))
+
+    def accessed(self):
+        env, _, _, accessed = self.env
+        times = dict(self.iterate())
+        with env.begin(db=accessed, buffers=True) as txn:
+            for key, value in txn.cursor():
+                name = bytes(key).decode("utf-8")
+                if name in times:
+                    times[name] = max(times[name], header.unpack(value)[0])
+        return times
+
+    def delete(self, name):
+        env, entries, _, accessed = self.env
+        with env.begin(write=True) as txn:
+            txn.delete(name.encode("utf-8"), db=entries)
+            txn.delete(name.encode("utf-8"), db=accessed)
+
+    def marked_empty(self, name):
+        value = self._get(name, empty=True)
+        if value is not None:
+            return header.unpack(value[: header.size])[0]
+
+    def mark_empty(self, name, updated=None):
+        self._put(name, b"", updated, empty=True)
+
+    def clear(self):
+        self.close()
+        for filename in ["data.mdb", "lock.mdb"]:
+            path = os.path.join(self.db_path, filename)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def iterate(self, empty=False):
+        env, entries, empties, _ = self.env
+        with env.begin(db=empties if empty else entries, buffers=True) as txn:
+            items = [
+                (bytes(key).decode("utf-8"), header.unpack(value[: header.size])[0])
+                for key, value in txn.cursor()
+            ]
+        yield from items
+
+    def stats(self):
+        env, entries, empties, _ = self.env
+        size = 0
+        with env.begin(db=entries, buffers=True) as txn:
+            count = txn.stat(entries)["entries"]
+            for _, value in txn.cursor():
+                size += len(value) - header.size
+        with env.begin(db=empties) as txn:
+            empty = txn.stat(empties)["entries"]
+        return {"entries": count, "empty": empty, "size": size}
+
+    def sizes(self):
+        env, entries, _, _ = self.env
+        with env.begin(db=entries, buffers=True) as txn:
+            items = [
+                (bytes(key).decode("utf-8"), len(value) - header.size)
+                for key, value in txn.cursor()
+            ]
+        yield from items
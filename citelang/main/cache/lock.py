@@ -0,0 +1,97 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import contextlib
+import os
+import threading
+import zlib
+
+import citelang.utils as utils
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# One lock for each lock file (closing a handle to it drops all we hold)
+locks = {}
+locks_guard = threading.Lock()
+
+
+def get_lock(path):
+    """
+    Get the (one) lock for a lock file for the process.
+    """
+    with locks_guard:
+        if path not in locks:
+            locks[path] = KeyLock(path)
+        return locks[path]
+
+
+class KeyLock:
+    """
+    An advisory lock for each cache name, between threads and processes.
+
+    Processes lock one byte (at an offset from the name) of one lock file,
+    so we don't need a file for each name. Locks are held by the process,
+    so threads also take a lock for the offset (kept while it is in use),
+    and the byte is only locked by the first (and unlocked by the last)
+    of nested blocks. A name can be locked while holding another (e.g.,
+    a package from a file looks up its dependencies). Two names can share
+    an offset, which only means they wait on each other.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "[citelang-cache-lock]"
+
+    @property
+    def fd(self):
+        """
+        Open the lock file once (closing it would release every lock we hold)
+        """
+        with self._guard:
+            if self._fd is None:
+                utils.mkdir_p(os.path.dirname(self.path))
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    @contextlib.contextmanager
+    def __call__(self, name):
+        offset = zlib.crc32(name.encode("utf-8"))
+        with self._guard:
+            # A thread lock, how many threads use it, and how deep we hold it
+            entry = self._locks.setdefault(offset, [threading.RLock(), 0, 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                if entry[2] == 0 and fcntl is not None:
+                    fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, offset)
+                entry[2] += 1
+                try:
+                    yield
+                finally:
+                    entry[2] -= 1
+                    if entry[2] == 0 and fcntl is not None:
+                        fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, offset)
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[offset]
+
+    def close(self):
+        with self._guard:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,129 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import collections
+import threading
+
+import citelang.utils as utils
+
+
+class MemoryCache:
+    """
+    A least recently used (LRU) cache of results in memory for a session.
+
+    We keep at most max_entries results (and max_bytes of their json, if
+    set) and evict the least recently used. Evicted results are still in
+    the cache backend, so we read them from there the next time.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.sizes = {}
+
+        # Names that point to another entry (e.g., without a version, or a
+        # blob of data) and back
+        self.aliases = {}
+        self.aliased = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "[citelang-memory-cache]"
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return self.aliases.get(name, name) in self.entries
+
+    def get(self, name):
+        """
+        Get a result (and mark it as recently used) or None
+        """
+        with self.lock:
+            name = self.aliases.get(name, name)
+            if name not in self.entries:
+                self.misses += 1
+                return
+            self.hits += 1
+            self.entries.move_to_end(name)
+            return self.entries[name]
+
+    def set(self, name, data, alias=None):
+        """
+        Add a result, and one or more aliases for it (keeping any it had),
+        and evict to fit the budget
+        """
+        size = 0
+        if self.max_bytes:
+            size = len(utils.dumps_json(data))
+        aliases = [alias] if isinstance(alias, str) else alias or []
+        with self.lock:
+            self.aliases.pop(name, None)
+            if name in self.entries:
+                self.bytes -= self.sizes[name]
+            self.entries[name] = data
+            self.entries.move_to_end(name)
+            self.sizes[name] = size
+            self.bytes += size
+            for alias in aliases:
+                self._remove(alias)
+                self.aliases[alias] = name
+                self.aliased.setdefault(name, set()).add(alias)
+            self._evict()
+
+    def delete(self, name):
+        with self.lock:
+            self._remove(name)
+
+    def _remove(self, name):
+        self.aliases.pop(name, None)
+        if name in self.entries:
+            del self.entries[name]
+            self._drop(name)
+
+    def _drop(self, name):
+        """
+        Drop the size and aliases of an entry that is no longer kept.
+        """
+        self.bytes -= self.sizes.pop(name)
+        for alias in self.aliased.pop(name, ()):
+            if self.aliases.get(alias) == name:
+                del self.aliases[alias]
+
+    def _evict(self):
+        while self.entries and (
+            (self.max_entries and len(self.entries) > self.max_entries)
+            or (self.max_bytes and self.bytes > self.max_bytes)
+        ):
+            name, _ = self.entries.popitem(last=False)
+            self._drop(name)
+            self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.aliases.clear()
+            self.aliased.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
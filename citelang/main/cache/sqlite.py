@@ -0,0 +1,181 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+import citelang.utils as utils
+from citelang.logger import logger
+
+from .backend import Backend
+
+
+class SQLiteBackend(Backend):
+    """
+    Entries, empty markers and metadata in one SQLite database (cache.db in
+    the cache directory) instead of a file for each. Entries written before
+    cache_encoding was added are json text, and newer ones are encoded bytes.
+
+    The database uses write-ahead logging (WAL) so more than one process
+    can read while another writes, and each thread has its own connection.
+    """
+
+    name = "sqlite"
+    schema_version = "1"
+    _local = threading.local()
+
+    @property
+    def db_path(self):
+        return os.path.join(self.cache_dir, "cache.db")
+
+    @property
+    def db(self):
+        """
+        Get a connection to the database for this thread, creating it if needed
+        """
+        connections = self._local.__dict__.setdefault("connections", {})
+        path = self.db_path
+        if path not in connections:
+            utils.mkdir_p(os.path.dirname(path))
+            db = sqlite3.connect(path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    name TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    updated REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS empty (
+                    name TEXT PRIMARY KEY,
+                    updated REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS accessed (
+                    name TEXT PRIMARY KEY,
+                    accessed REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS metadata (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                """)
+            db.execute(
+                "INSERT OR IGNORE INTO metadata VALUES ('schema_version', ?), ('created', ?)",
+                (self.schema_version, str(time.time())),
+            )
+            connections[path] = db
+        return connections[path]
+
+    def close(self):
+        """
+        Close connections for this thread
+        """
+        for db in self._local.__dict__.pop("connections", {}).values():
+            db.close()
+
+    def get_cache_name(self, name):
+        return "%s:%s" % (self.db_path, name)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Write everything in one transaction
+        """
+        db = self.db
+        db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def get(self, name):
+        row = self.db.execute(
+            "SELECT data FROM entries WHERE name = ?", (name,)
+        ).fetchone()
+        if not row:
+            return
+        try:
+            return self.decode(row[0])
+        except Exception:
+            logger.warning(f"Cache entry {name} is corrupt, removing.")
+            self.db.execute("DELETE FROM entries WHERE name = ?", (name,))
+
+    def set(self, name, data, updated=None):
+        content = self.encode(data)
+        self.db.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+            (name, content, len(content), updated or time.time()),
+        )
+
+    def updated(self, name):
+        row = self.db.execute(
+            "SELECT updated FROM entries WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def touch(self, name):
+        try:
+            self.db.execute(
+                "INSERT OR REPLACE INTO accessed VALUES (?, ?)", (name, time.time())
+            )
+        except sqlite3.Error:
+            pass
+
+    def accessed(self):
+        return dict(
+            self.db.execute(
+                "SELECT e.name, MAX(e.updated, COALESCE(a.accessed, 0)) FROM entries e "
+                "LEFT JOIN accessed a ON a.name = e.name"
+            ).fetchall()
+        )
+
+    def delete(self, name):
+        self.db.execute("DELETE FROM entries WHERE name = ?", (name,))
+        self.db.execute("DELETE FROM accessed WHERE name = ?", (name,))
+
+    def marked_empty(self, name):
+        row = self.db.execute(
+            "SELECT updated FROM empty WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def mark_empty(self, name, updated=None):
+        self.db.execute(
+            "INSERT OR REPLACE INTO empty VALUES (?, ?)", (name, updated or time.time())
+        )
+
+    def clear(self):
+        self.close()
+        for path in [self.db_path, self.db_path + "-wal", self.db_path + "-shm"]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def iterate(self, empty=False):
+        table = "empty" if empty else "entries"
+        yield from self.db.execute("SELECT name, updated FROM %s" % table).fetchall()
+
+    def stats(self):
+        entries, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        empty = self.db.execute("SELECT COUNT(*) FROM empty").fetchone()[0]
+        return {"entries": entries, "empty": empty, "size": size}
+
+    def sizes(self):
+        yield from self.db.execute("SELECT name, size FROM entries").fetchall()
+
+    def get_metadata(self):
+        """
+        Get metadata for the database (e.g., schema version)
+        """
+        return dict(self.db.execute("SELECT key, value FROM metadata").fetchall())
+
+    def set_metadata(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?)", (key, value))
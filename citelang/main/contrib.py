@@ -68,7 +68,7 @@ def blame_task(args):
 
     # Structure in cache mirrors structure of repo
     utils.mkdir_p(os.path.dirname(tmp_file))
-    utils.write_json(items, tmp_file)
+    utils.write_json(items, tmp_file, pretty=False)
     os.rename(tmp_file, save_to)
     return {"output": items, "path": path, "exist": False, "empty": ""}
 
@@ -505,7 +505,7 @@ class ContributionParser(GitParser):
         if self.start and self.end:
             uid = "%s-%s" % (self.start, self.end)
             cached_result = os.path.join(self.outdir, "%s.json" % uid)
-            utils.write_json(stats, cached_result)
+            utils.write_json(stats, cached_result, pretty=False)
         return stats
 
     def get_tag_commit(self, tag):
@@ -3,9 +3,9 @@ __copyright__ = "Copyright 2022, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
 import sys
-from datetime import datetime
 
 import citelang.defaults as defaults
+import citelang.main.cache as cache
 import citelang.main.http as http
 import citelang.main.result as results
 from citelang.logger import logger
@@ -15,9 +15,12 @@ registry = {}
 registry_names = []
 
 
-def get_endpoint(name, data=None, **kwargs):
+def get_endpoint(name, data=None, cache_name=None, retrieve=None, **kwargs):
     """
-    Get a named endpoint, optionally, using the cache (default)
+    Get a named endpoint, optionally, using the cache (default). If we are
+    given a cache name, we revalidate what we have for it (if anything).
+    Data comes from retrieve instead of the url if given (e.g., a custom
+    package manager).
     """
     if name not in registry:
         names = registry_names
@@ -30,7 +33,11 @@ def get_endpoint(name, data=None, **kwargs):
     # Create the endpoint with any optional params
     if not data:
         endpoint = registry[name](**kwargs, require_params=False)
-        return results.Table(http.get(endpoint.url), endpoint)
+        if cache_name:
+            data = cache.cache.fetch(cache_name, endpoint.url, endpoint, retrieve)
+            return results.Table(data, endpoint)
+        data = retrieve() if retrieve else http.get(endpoint.url)
+        return results.Table(data, endpoint)
     endpoint = registry[name](**kwargs)
     return results.Table(data, endpoint)
 
@@ -59,6 +66,12 @@ class Endpoint:
         """
         return data
 
+    def slim(self, data):
+        """
+        Return a slim record (only what citelang uses) of data to cache.
+        """
+        return data
+
     def require_params(self, **kwargs):
         required = getattr(self, "format_url", [])
         params = {}
@@ -139,6 +152,14 @@ class Dependencies(Endpoint):
     def table_data(self, data):
         return data.get("dependencies")
 
+    def slim(self, data):
+        """
+        The dependencies are shown as is, but we only need version numbers
+        """
+        if isinstance(data, dict) and data.get("versions"):
+            data = dict(data, versions=slim_versions(data["versions"]))
+        return data
+
 
 class Package(Endpoint):
     name = "package"
@@ -152,18 +173,37 @@ class Package(Endpoint):
         "original_license",
     ]
 
+    # Fields we use for a package (versions only have number and published_at)
+    slim_fields = [
+        "name",
+        "platform",
+        "homepage",
+        "repository_url",
+        "licenses",
+        "latest_release_number",
+        "latest_stable_release_published_at",
+        "default_version",
+        "dependencies",
+        "versions",
+    ]
+
+    def slim(self, data):
+        if not isinstance(data, dict):
+            return data
+        data = {k: data[k] for k in self.slim_fields if k in data}
+        if data.get("versions"):
+            data["versions"] = slim_versions(data["versions"])
+        return data
+
     def order(self, data):
         """
-        Order versions by published at
+        Order versions by published at (an iso date sorts as a string)
         """
         versions = data.get("versions", [])
         if versions and "published_at" in versions[0]:
             try:
                 data["versions"] = sorted(
-                    versions,
-                    key=lambda x: datetime.strptime(
-                        x["published_at"].split("T", 1)[0], "%Y-%m-%d"
-                    ),
+                    versions, key=lambda x: x["published_at"].split("T", 1)[0]
                 )
             except Exception:
                 pass
@@ -184,6 +224,20 @@ class Package(Endpoint):
         return "Package " + self.params.get("package_name", "")
 
 
+def slim_versions(versions):
+    """
+    Keep only the number and published at for each version
+    """
+    return [
+        (
+            {k: v[k] for k in ["number", "published_at"] if k in v}
+            if isinstance(v, dict)
+            else v
+        )
+        for v in versions
+    ]
+
+
 for endpoint in [PackageManagers, Package, Dependencies]:
     registry_names.append(endpoint.name)
     registry[endpoint.name] = endpoint
@@ -1,6 +1,8 @@
 from .cypher import Cypher
 from .dot import Dot
+from .exact import ExactGraph
 from .gexf import Gexf
-from .graph import Graph, Node
+from .graph import DAGNode, Graph, Node
+from .resolved import Resolved, ResolvedPackage
 from .text import Console
 from .tree import print_tree
@@ -26,13 +26,9 @@ class GraphBase:
         """
         Create a flattened list of dependency names, and generate placeholder names
         """
-        next_nodes = [self.data]
-        while next_nodes:
-            next_node = next_nodes.pop(0)
-            if next_node.name not in self.uids:
-                self.uids[next_node.name] = self.generate_placeholder()
-            for child in next_node.children:
-                next_nodes.append(child)
+        for node in self.data.iternodes():
+            if node.name not in self.uids:
+                self.uids[node.name] = self.generate_placeholder()
 
     def iter_nodes(self):
         """
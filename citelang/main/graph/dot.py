@@ -39,10 +39,8 @@ class Dot(GraphBase):
         node_color = colors.pop()
 
         # Create graph with nodes
-        next_nodes = [self.data]
         first_node = True
-        while next_nodes:
-            next_node = next_nodes.pop(0)
+        for next_node in self.data.iternodes():
             label = self.uids[next_node.name]
             name = "%s (%s)" % (next_node.name, round(next_node.credit, 3))
             if first_node:
@@ -56,13 +54,9 @@ class Dot(GraphBase):
                     ' %s [label="%s" tooltip="%s", style=filled, color="%s"];\n'
                     % (label, name, name, node_color)
                 )
-            for child in next_node.children:
-                next_nodes.append(child)
 
         # Now create links
-        next_nodes = [self.data]
-        while next_nodes:
-            next_node = next_nodes.pop(0)
+        for next_node in self.data.iternodes():
             label = self.uids[next_node.name]
             name = "%s (%s)" % (next_node.name, round(next_node.credit, 3))
             for child in next_node.children:
@@ -71,7 +65,6 @@ class Dot(GraphBase):
                     ' %s -> %s [label=" depends on " tooltip="%s -> %s"];\n'
                     % (label, label_to, next_node.name, child.name)
                 )
-                next_nodes.append(child)
 
         fd.write("\n}\n")
         if self.outfile != sys.stdout:
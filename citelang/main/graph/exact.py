@@ -0,0 +1,148 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import collections
+
+import citelang.main.package as package
+from citelang.logger import logger
+
+from .graph import DAGNode
+from .resolved import Resolved
+
+
+class ExactGraph:
+    """
+    An exact graph calculates credit for a resolved dependency graph without
+    expanding a tree. Each package passes the same share of (1 - credit_split)
+    of its weight to each dependency, and we visit packages in topological
+    order so a package has all of its weight before we pass any on. The
+    result is the credit of an infinite tree (without a min_credit cutoff)
+    for a graph without cycles.
+
+    A dependency on a package that we are still visiting (a cycle) is not
+    followed, and that share stays with the package that depends on it.
+    """
+
+    def __init__(self, resolved, manager):
+        if isinstance(resolved, str):
+            resolved = Resolved.load(resolved)
+        self.resolved = resolved
+        self.manager = manager
+
+        # Lookup of package by dependency name, and dependencies by uid
+        self.lookup = {}
+        self.deps = {}
+        self.cycles = []
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "[citelang-exact-graph]"
+
+    def get_uid(self, name):
+        """
+        Get the unique id for a dependency name, the same as _graph would.
+        """
+        if name not in self.lookup:
+            pkg = package.get_package(self.manager, name, use_cache=False)
+            self.lookup[name] = (Resolved.get_uid(pkg), pkg)
+        return self.lookup[name][0]
+
+    def get_dependencies(self, uid):
+        """
+        Get a count of dependencies (by uid) for a package we've resolved
+        """
+        if uid not in self.deps:
+            pkg = self.resolved.packages.get(uid)
+            names = pkg.deps if pkg else []
+            self.deps[uid] = collections.Counter(
+                self.get_uid(x) for x in names if x and not x.startswith("__")
+            )
+        return self.deps[uid]
+
+    def sort(self, root):
+        """
+        Topologically sort packages reachable from the root.
+
+        Dependencies that point back to a package we are still visiting are
+        cycles, and we return them to skip.
+        """
+        order = []
+        visiting = {root}
+        done = set()
+        cycles = set()
+        stack = [(root, iter(self.get_dependencies(root)))]
+        while stack:
+            uid, deps = stack[-1]
+            for dep in deps:
+                if dep in visiting:
+                    cycles.add((uid, dep))
+                elif dep not in done:
+                    visiting.add(dep)
+                    stack.append((dep, iter(self.get_dependencies(dep))))
+                    break
+            else:
+                stack.pop()
+                visiting.remove(uid)
+                done.add(uid)
+                order.append(uid)
+
+        order.reverse()
+        return order, cycles
+
+    def graph(self, uid, credit_split=0.5, min_credit=0.01):
+        """
+        Calculate exact credit for a root (by uid), and return the root node
+        of a DAG that holds the credit for each package.
+        """
+        if uid not in self.resolved.packages:
+            logger.exit("%s is not in the resolved graph." % uid)
+
+        order, cycles = self.sort(uid)
+        if cycles:
+            logger.warning(
+                "Found %s dependency cycles, credit for them stays with the dependent package."
+                % len(cycles)
+            )
+            for parent, child in sorted(cycles):
+                logger.debug("%s depends on %s, which depends on it." % (parent, child))
+        self.cycles = sorted(cycles)
+
+        # Packages we didn't resolve (e.g., after max_deps) don't have dependencies
+        packages = {pkg_uid: pkg for pkg_uid, pkg in self.lookup.values()}
+        packages.update(self.resolved.packages)
+
+        nodes = {}
+        for key in order:
+            nodes[key] = DAGNode(
+                obj=packages[key],
+                weight=0,
+                credit_split=credit_split,
+                min_credit=min_credit,
+                is_root=key == uid,
+            )
+        root = nodes[uid]
+        root.weight = 1.0
+
+        # Everything that depends on a package comes before it
+        for key in order:
+            node = nodes[key]
+            deps = self.get_dependencies(key)
+            if not deps:
+                continue
+            share = ((1 - credit_split) * node.weight) / len(packages[key].deps)
+            for dep, count in deps.items():
+                if (key, dep) in cycles:
+                    continue
+                child = nodes[dep]
+                if not child.depth:
+                    child.depth = node.depth + 1
+                node.add_child(child, share * count)
+
+        root.unexpanded_credit = sum(
+            nodes[key].credit for key in order if key not in self.resolved.packages
+        )
+        root.children_names = list({node.name for node in nodes.values()})
+        return root
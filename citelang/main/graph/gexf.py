@@ -35,21 +35,15 @@ class Gexf(GraphBase):
         fd.write(template % (today, self.data.name))
 
         # Create graph with nodes
-        next_nodes = [self.data]
-        while next_nodes:
-            next_node = next_nodes.pop(0)
+        for next_node in self.data.iternodes():
             label = self.uids[next_node.name]
             name = "%s (%s)" % (next_node.name, round(next_node.credit, 3))
             fd.write('        <node id="%s" label="%s"/>\n' % (label, name))
-            for child in next_node.children:
-                next_nodes.append(child)
 
         fd.write("    </nodes>\n    <edges>")
 
         # Now create links
-        next_nodes = [self.data]
-        while next_nodes:
-            next_node = next_nodes.pop(0)
+        for next_node in self.data.iternodes():
             label = self.uids[next_node.name]
             name = "%s (%s)" % (next_node.name, round(next_node.credit, 3))
             for child in next_node.children:
@@ -58,7 +52,6 @@ class Gexf(GraphBase):
                     '        <edge id="%s" source="%s" target="%s" label="depends on"/>\n'
                     % (label_to, label, label_to)
                 )
-                next_nodes.append(child)
 
         fd.write("    </edges>\n")
         fd.write("</graph>\n")
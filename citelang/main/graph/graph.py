@@ -2,8 +2,26 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2022, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
+import collections
+
 
 class Node:
+
+    # A large graph has many nodes, so we don't give each one a dict
+    __slots__ = (
+        "obj",
+        "weight",
+        "children",
+        "credit_split",
+        "depth",
+        "min_credit",
+        "is_root",
+        "total_credit",
+        "children_names",
+        "unexpanded_credit",
+        "truncated",
+    )
+
     def __init__(
         self, obj, weight, credit_split=0.5, depth=0, min_credit=0.01, is_root=False
     ):
@@ -21,15 +39,23 @@ class Node:
         # If we stop parsing we can set this credit to whatever the node and
         # children would originall get
         self.total_credit = None
-        self.children_names = []
+
+        # Names of all packages in the graph (set for the root)
+        self.children_names = ()
+
+        # Credit on nodes we didn't look into (set for the root)
+        self.unexpanded_credit = 0
+
+        # Did we stop early because we ran out of time?
+        self.truncated = False
 
     def iternodes(self):
         """
         Iterate through all nodes of the graph
         """
-        nodes = [self]
+        nodes = collections.deque([self])
         while nodes:
-            node = nodes.pop(0)
+            node = nodes.popleft()
             yield node
             nodes += node.children
 
@@ -62,6 +88,58 @@ class Node:
         return self.credit_split * self.weight
 
 
+class DAGNode(Node):
+    """
+    A DAG node is one unique package (manager, name, version) that can have
+    more than one parent. Edges carry the credit passed from parent to child.
+    """
+
+    __slots__ = ("edges",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.edges = {}
+
+    @classmethod
+    def get_key(cls, obj):
+        return (obj.manager, obj.name, obj.version)
+
+    @property
+    def key(self):
+        return self.get_key(self.obj)
+
+    def iternodes(self):
+        """
+        Iterate through unique nodes of the graph
+        """
+        seen = set()
+        nodes = collections.deque([self])
+        while nodes:
+            node = nodes.popleft()
+            if node in seen:
+                continue
+            seen.add(node)
+            yield node
+            nodes += node.children
+
+    def add_child(self, child, weight=0):
+        """
+        Add an edge to a child, and pass it credit.
+        """
+        if child not in self.edges:
+            self.children.append(child)
+            self.edges[child] = 0
+        self.edges[child] += weight
+        child.weight += weight
+
+    @property
+    def credit(self):
+        """
+        A node keeps whatever credit it doesn't pass to its children.
+        """
+        return self.weight - sum(self.edges.values())
+
+
 class Graph:
     def __init__(self, root):
         self.root = root
@@ -0,0 +1,120 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import sys
+
+import citelang.utils as utils
+from citelang.logger import logger
+
+
+class ResolvedPackage:
+    """
+    A resolved package holds only what we need to calculate credit.
+    """
+
+    __slots__ = ("manager", "name", "version", "homepage", "deps")
+
+    underlying_manager = None
+
+    def __init__(self, manager, name, version=None, homepage=None, dependencies=None):
+        self.manager = sys.intern(manager)
+        self.name = sys.intern(name)
+        self.version = version
+        self.homepage = homepage
+        self.deps = [sys.intern(x) for x in dependencies or []]
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "[citelang-resolved-package]"
+
+    def dependencies(self, return_data=False):
+        return [{"name": name, "project_name": name} for name in self.deps]
+
+    def to_dict(self):
+        return {
+            "manager": self.manager,
+            "name": self.name,
+            "version": self.version,
+            "homepage": self.homepage,
+            "dependencies": self.deps,
+        }
+
+
+class Resolved:
+    """
+    A resolved graph is the dependencies for every package we looked up
+    for one or more roots, without any credit. Once it is frozen, we can
+    calculate credit from it again (with different parameters) without
+    any requests.
+    """
+
+    def __init__(self, packages=None, frozen=False):
+        self.packages = packages or {}
+        self.frozen = frozen
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "[citelang-resolved]"
+
+    def __len__(self):
+        return len(self.packages)
+
+    @staticmethod
+    def get_uid(obj):
+        """
+        Get a unique id for a package (before we look up the version)
+        """
+        uid = "%s:%s" % (obj.manager, obj.name)
+        if obj.version:
+            uid = "%s@%s" % (uid, obj.version)
+        return uid
+
+    def get(self, obj):
+        return self.packages.get(self.get_uid(obj))
+
+    def add(self, uid, obj, deps):
+        """
+        Add a package (and the names of its dependencies) by unique id.
+
+        A dependency without a name is kept (empty) since it still counts
+        when we split credit between dependencies.
+        """
+        names = [dep.get("name") or dep.get("project_name") or "" for dep in deps]
+        pkg = ResolvedPackage(
+            manager=obj.manager,
+            name=obj.name,
+            version=obj.version,
+            homepage=obj.homepage,
+            dependencies=names,
+        )
+        self.packages[uid] = pkg
+        return pkg
+
+    def to_dict(self):
+        return {uid: pkg.to_dict() for uid, pkg in self.packages.items()}
+
+    def print_json(self):
+        print(utils.print_json(self.to_dict()))
+
+    def save(self, outfile):
+        """
+        Save to output file
+        """
+        logger.info("Saving to %s..." % outfile)
+        utils.write_json(self.to_dict(), outfile)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load a (frozen) resolved graph from file
+        """
+        packages = {
+            uid: ResolvedPackage(**meta)
+            for uid, meta in utils.read_json(filename).items()
+        }
+        return cls(packages, frozen=True)
@@ -35,10 +35,12 @@ def print_tree(root):
     print(tree)
 
 
-def generate_tree(next_node, icon, tree=None) -> None:
+def generate_tree(next_node, icon, tree=None, seen=None) -> None:
     """
     Recursively build a Tree with a dependency result
     """
+    seen = seen if seen is not None else set()
+    seen.add(next_node)
     for child in next_node.children:
         # We won't have a tree on the first run
         credit = round(child.credit, child.round_by)
@@ -47,4 +49,7 @@ def generate_tree(next_node, icon, tree=None) -> None:
         node.stylize(f"link file://{child.name}")
         node.append(f" ({credit})", "blue")
         branch = tree.add(Text(icon) + node)
-        generate_tree(child, tree=branch, icon=icon)
+
+        # A node shared in a DAG is only expanded the first time
+        if child not in seen:
+            generate_tree(child, tree=branch, icon=icon, seen=seen)
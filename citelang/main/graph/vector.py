@@ -0,0 +1,246 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2022, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import citelang.main.package as package
+import citelang.main.packages as packages
+from citelang.logger import logger
+
+from .resolved import Resolved
+
+try:
+    import numpy as np
+except ImportError:
+    logger.exit(
+        "numpy is needed to calculate credit with arrays. pip install citelang[vector]."
+    )
+
+
+class CreditGraph:
+    """
+    A credit graph stores a resolved dependency graph as arrays, with
+    dependencies in compressed sparse row (CSR) format: the dependencies of
+    package i are indices[offsets[i]:offsets[i+1]].
+
+    Credit is calculated for an entire level of the tree at once, and comes
+    out the same as walking the tree with BaseClient._graph.
+    """
+
+    def __init__(self, resolved):
+        if isinstance(resolved, str):
+            resolved = Resolved.load(resolved)
+        self.resolved = resolved
+
+        # Lookup of package index by unique id, and by manager and dependency name
+        self.uids = {}
+        self.lookup = {}
+        self.managers = []
+        self.names = []
+        self.homepages = []
+
+        # Resolved packages come first, so they line up with offsets
+        records = list(resolved.packages.items())
+        for uid, pkg in records:
+            self.add(uid, pkg)
+
+        # The number of dependencies includes those we don't add as children
+        ndeps = []
+        offsets = [0]
+        indices = []
+        for _, pkg in records:
+            manager = self.get_manager(pkg.manager)
+            ndeps.append(len(pkg.deps))
+            for name in pkg.deps:
+                if not name.startswith("__"):
+                    indices.append(self.get_index(manager, name))
+            offsets.append(len(indices))
+
+        # Packages we didn't resolve don't have dependencies
+        unresolved = len(self.names) - len(records)
+        ndeps += [0] * unresolved
+        offsets += [offsets[-1]] * unresolved
+
+        self.ndeps = np.array(ndeps, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+
+        # We stop after max deps unique names (regardless of manager)
+        _, self.name_ids = np.unique(
+            np.array(self.names, dtype=object), return_inverse=True
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "[citelang-credit-graph]"
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, uid, pkg):
+        """
+        Add a package by unique id, and return the index
+        """
+        if uid not in self.uids:
+            self.uids[uid] = len(self.names)
+            self.managers.append(pkg.manager)
+            self.names.append(pkg.name)
+            self.homepages.append(pkg.homepage)
+        return self.uids[uid]
+
+    def get_manager(self, manager):
+        """
+        Dependencies of a custom package (e.g., requirements.txt) are pypi
+        """
+        custom = packages.managers.get(manager)
+        return getattr(custom, "underlying_manager", None) or manager
+
+    def get_index(self, manager, name):
+        """
+        Get the index of a package, the same as _graph would look it up.
+        """
+        key = (manager, name)
+        if key not in self.lookup:
+            pkg = package.get_package(manager, name, use_cache=False)
+            self.lookup[key] = self.add(Resolved.get_uid(pkg), pkg)
+        return self.lookup[key]
+
+    def get_children(self, pkgs):
+        """
+        Get the child package indices for an array of packages, in order
+        """
+        starts = self.offsets[pkgs]
+        counts = self.offsets[pkgs + 1] - starts
+        shift = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return self.indices[shift + np.arange(counts.sum())]
+
+    def expand(
+        self, root, credit_split=0.5, min_credit=0.01, max_depth=None, max_deps=None
+    ):
+        """
+        Expand the tree for a root index one level at a time, and return the
+        package index and credit for each node.
+
+        This mirrors the parsing in _graph. When we stop or skip a node with
+        dependencies (an event) the nodes created before it get all of their
+        weight, unless they have children, in which case they keep their split.
+        """
+        levels = []
+        level = (
+            np.array([root], dtype=np.int64),
+            np.array([1.0]),
+            np.array([-1], dtype=np.int64),
+        )
+        seen = np.zeros(self.name_ids.max() + 1 if len(self) else 0, dtype=bool)
+        start = 0
+        depth = 0
+        last_event = -1
+
+        while len(level[0]):
+            pkgs, weights, parents = level
+            count = len(pkgs)
+            ndeps = self.ndeps[pkgs]
+            nchildren = self.offsets[pkgs + 1] - self.offsets[pkgs]
+            has_deps = ndeps > 0
+            with np.errstate(divide="ignore", invalid="ignore"):
+                dep_credit = ((1 - credit_split) * weights) / ndeps
+            skip = has_deps & (dep_credit < min_credit)
+
+            # Stopping point - exceeded max depth or max deps
+            stopping = np.zeros(count, dtype=bool)
+            if max_depth and depth > max_depth:
+                stopping[:] = True
+            if max_deps:
+                names = self.name_ids[pkgs]
+                _, first = np.unique(names, return_index=True)
+                new = np.zeros(count, dtype=bool)
+                new[first] = ~seen[names[first]]
+                seen_before = seen.sum() + np.cumsum(new) - new
+                stopping |= seen_before + 1 > max_deps
+                seen[names] = True
+            stop = int(np.argmax(stopping)) if stopping.any() else count
+
+            processed = np.arange(count) < stop
+            events = np.flatnonzero(processed & skip)
+            if stop < count and has_deps[stop]:
+                events = np.append(events, stop)
+            if len(events):
+                last_event = start + events[-1]
+
+            expanded = processed & has_deps & ~skip
+            levels.append((pkgs, weights, parents, expanded, nchildren))
+
+            # Children for the next level get an equal share of dependency credit
+            expanding = np.flatnonzero(expanded)
+            counts = nchildren[expanding]
+            level = (
+                self.get_children(pkgs[expanding]),
+                np.repeat(dep_credit[expanding], counts),
+                np.repeat(start + expanding, counts),
+            )
+            start += count
+            depth += 1
+
+            # The children of nodes before we stopped are created, but not parsed
+            if stop < count:
+                levels.append(
+                    (level[0], level[1], level[2], np.zeros(len(level[0]), bool), 0)
+                )
+                break
+
+        pkgs, weights, parents, expanded, nchildren = [
+            np.concatenate([np.broadcast_to(x[i], x[0].shape) for x in levels])
+            for i in range(5)
+        ]
+        positions = np.arange(len(pkgs))
+
+        # Nodes created before the last event get all weight (or keep their split)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            split = weights - (((1 - credit_split) * weights) / nchildren) * nchildren
+        has_children = expanded & (nchildren > 0) & (positions < last_event)
+        credit = np.where(
+            parents < last_event,
+            np.where(has_children, split, weights),
+            credit_split * weights,
+        )
+
+        # The root is never redistributed, unless it is the event
+        credit[0] = weights[0] if last_event == 0 else credit_split * weights[0]
+        return pkgs, credit
+
+    def credit(self, manager, name, **kwargs):
+        """
+        Get a vector of credit (indexed by package) for a root package
+        """
+        uid = Resolved.get_uid(package.get_package(manager, name, use_cache=False))
+        if uid not in self.uids:
+            logger.exit("%s is not in the resolved graph." % uid)
+        pkgs, credit = self.expand(self.uids[uid], **kwargs)
+        return np.bincount(pkgs, weights=credit, minlength=len(self)), pkgs
+
+    def table(self, roots, **kwargs):
+        """
+        Prepare a credit table for a list of (manager, name) roots.
+
+        This is the same table (and average credit) as Parser._prepare_table.
+        """
+        table = {}
+        splitby = 1 / len(roots)
+        for manager, name in roots:
+            credit, pkgs = self.credit(manager, name, **kwargs)
+
+            # Add packages in the order they are found in the tree
+            _, first = np.unique(pkgs, return_index=True)
+            for idx in pkgs[np.sort(first)]:
+                pkg_manager = self.managers[idx]
+                pkg_name = self.names[idx]
+                if pkg_manager not in table:
+                    table[pkg_manager] = {}
+                if pkg_name not in table[pkg_manager]:
+                    table[pkg_manager][pkg_name] = {
+                        "credit": 0,
+                        "url": self.homepages[idx],
+                    }
+                table[pkg_manager][pkg_name]["credit"] += credit[idx] * splitby
+        return table
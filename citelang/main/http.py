@@ -3,12 +3,16 @@ __copyright__ = "Copyright 2022, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
 
+import collections
 import json
 import os
+import threading
 import time
 
 import requests
+from requests.adapters import HTTPAdapter
 
+import citelang.main.settings as settings
 from citelang.logger import logger
 
 default_headers = {"Accept": "application/json", "User-Agent": "citelang-python"}
@@ -18,24 +22,100 @@ api_key = os.environ.get("CITELANG_LIBRARIES_KEY")
 if api_key:
     params.update({"api_key": api_key})
 
+# Counts of requests (and responses by status code) for the session
+counts = collections.Counter()
 
-def check_response(typ, r, return_json=True, stream=False, retry=True):
+# The rate limit (and remaining requests) the server told us about last
+quota = {}
+
+# Limit requests per minute (e.g., to warm the cache) if set
+limiter = None
+
+# One session for every request, so connections are pooled and kept alive
+session = None
+session_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    Space out requests (between threads) to at most rate a minute.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.interval = 60.0 / rate
+        self.next = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            wait = self.next - now
+            self.next = max(now, self.next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def get_session():
+    """
+    Get the shared session, with a pool of http_pool_size connections for
+    each host that are kept alive (unless http_keep_alive is false)
+    """
+    global session
+    with session_lock:
+        if session is None:
+            size = settings.cfg.http_pool_size or 10
+            adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+            new = requests.Session()
+            new.mount("https://", adapter)
+            new.mount("http://", adapter)
+            if settings.cfg.http_keep_alive is False:
+                new.headers["Connection"] = "close"
+            session = new
+    return session
+
+
+def set_rate(rate=None):
+    """
+    Limit requests to a rate per minute (or unset for no limit)
+    """
+    global limiter
+    limiter = RateLimiter(rate) if rate else None
+
+
+def send(typ, url, **kwargs):
+    """
+    Send a request when the rate limit allows, and count it.
+    """
+    if limiter:
+        limiter.wait()
+    r = get_session().request(typ, url, **kwargs)
+    counts["requests"] += 1
+    counts[r.status_code] += 1
+    for key in ["limit", "remaining"]:
+        value = r.headers.get("X-RateLimit-%s" % key.capitalize())
+        if value is not None:
+            quota[key] = value
+    return r
+
+
+def check_response(typ, r, return_json=True, stream=False, retry=True, statuses=None):
     """
-    Ensure the response status code is 20x
+    Ensure the response status code is 20x (or one of statuses)
     """
-    session = requests.session()
+    statuses = statuses or [200, 201]
 
     # Rate is 60/minute
     if r.status_code == 429:
         logger.info("Exceeded API limit, sleeping 1 minute.")
         time.sleep(60)
-        r = session.send(r.request)
-        return check_response(typ, r, return_json, stream, retry=retry)
+        r = get_session().send(r.request)
+        return check_response(typ, r, return_json, stream, retry, statuses)
 
     if r.status_code == 401:
         logger.exit("You must set CITELAG_LIBRARIES_KEY in the environment.")
 
-    if r.status_code not in [200, 201]:
+    if r.status_code not in statuses:
         logger.exit(
             "Unsuccessful response: %s, %s %s" % (r.status_code, r.reason, r.text)
         )
@@ -73,13 +153,9 @@ def do_request(
 
     # The first post when you upload the model defines the flavor (regression)
     if json:
-        r = requests.request(
-            typ, url, json=json, headers=headers, stream=stream, params=params
-        )
+        r = send(typ, url, json=json, headers=headers, stream=stream, params=params)
     else:
-        r = requests.request(
-            typ, url, data=data, headers=headers, stream=stream, params=params
-        )
+        r = send(typ, url, data=data, headers=headers, stream=stream, params=params)
     if not stream and not return_json:
         print_response(r)
     return check_response(typ, r, return_json=return_json, stream=stream)
@@ -108,6 +184,31 @@ def delete(url, data=None, json=None, headers=None, return_json=True):
     )
 
 
+def get_conditional(url, etag=None, last_modified=None):
+    """
+    Perform a GET request that only returns data if it changed since an etag
+    or last modified time (otherwise None), and the etag and last modified
+    time of the response to check with next time.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    headers.update(default_headers)
+    logger.info("GET %s" % url)
+
+    r = send("get", url, headers=headers, params=params)
+    r = check_response("get", r, return_json=False, stream=True, statuses=[200, 304])
+    validators = {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+    }
+    if r.status_code == 304:
+        return None, validators
+    return r.json(), validators
+
+
 def get(url, data=None, json=None, headers=None, return_json=True, stream=False):
     """
     Perform a GET request
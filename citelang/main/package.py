@@ -2,6 +2,8 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2022, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
+import sys
+
 import citelang.main.cache as cache
 import citelang.main.endpoints as endpoints
 import citelang.main.packages as packages
@@ -100,12 +102,12 @@ class PackageBase:
 
         # invalid characters found!
         name = name.replace(";", "")
-        self.name = name
+        self.name = sys.intern(name)
 
     def dependencies(self, return_data=False):
         raise NotImplementedError
 
-    def info(self):
+    def info(self, full=False):
         raise NotImplementedError
 
 
@@ -150,42 +152,47 @@ class CustomPackage(PackageBase):
         if "dependencies" in manager.data:
             return manager.data["dependencies"]
 
-        cache_name = None
         result = None
 
-        # If we aren't given a version, look for default branches
-        if not self.version and manager.default_versions and self.use_cache:
-            for version in manager.default_versions:
-                cache_name = f"package/{self.manager}/{self.name}/{version}"
-                result = self.cache.get(cache_name)
-                if result:
-                    result = endpoints.get_endpoint("dependencies", data=result)
-                    self.version = version
-                    break
-
-        # If we don't have a version, we have to retrieve an update
-        if not result and not self.version:
-            deps = manager.package(self.name)
-            result = endpoints.get_endpoint("dependencies", data=deps)
-            self.version = result.data.get("default_version")
-            cache_name = f"package/{self.manager}/{self.name}/{self.version}"
+        # If we aren't given a version, look for default branches, or retrieve
+        # an update to find it (one process or thread at once)
+        if not self.version:
+            with self.cache.lock(self.cache_name):
+                if manager.default_versions and self.use_cache:
+                    for version in manager.default_versions:
+                        cache_name = f"package/{self.manager}/{self.name}/{version}"
+                        result = self.cache.get(cache_name)
+                        if result:
+                            result = endpoints.get_endpoint("dependencies", data=result)
+                            self.version = version
+                            break
+                if not result:
+                    deps = manager.package(self.name)
+                    result = endpoints.get_endpoint("dependencies", data=deps)
+                    self.version = result.data.get("default_version")
+                    cache_name = f"package/{self.manager}/{self.name}/{self.version}"
+                    self.cache.set(cache_name, result)
 
         # We have a version, either retrieve from cache or anew
-        elif not result and self.version:
+        else:
             cache_name = f"package/{self.manager}/{self.name}/{self.version}"
             result = self.cache.get(cache_name)
             if not result or not self.use_cache:
-                version = "@%s" % self.version if self.version else ""
-                logger.info("Retrieving new result for %s%s..." % (self.name, version))
-                deps = manager.package(self.name)
-                result = endpoints.get_endpoint("dependencies", data=deps)
-            elif result:
+                logger.info(
+                    "Retrieving new result for %s@%s..." % (self.name, self.version)
+                )
+                result = endpoints.get_endpoint(
+                    "dependencies",
+                    cache_name=cache_name if self.use_cache else None,
+                    retrieve=lambda: manager.package(self.name),
+                )
+
+                # Without the cache, fetch didn't save it for us
+                if not self.use_cache:
+                    self.cache.set(cache_name, result)
+            else:
                 result = endpoints.get_endpoint("dependencies", data=result)
 
-        # If cache is enabled, we save the result
-        if result and cache_name:
-            self.cache.set(cache_name, result)
-
         # Return the wrapped result or raw data
         deps = result.data.get("dependencies", [])
         self.data["package"] = result.data
@@ -194,9 +201,9 @@ class CustomPackage(PackageBase):
             return deps
         return result
 
-    def info(self):
+    def info(self, full=False):
         """
-        Get info for a custom package
+        Get info for a custom package (full skips the slim cached record)
         """
         manager = self.underlying_manager
 
@@ -205,23 +212,28 @@ class CustomPackage(PackageBase):
             return manager.data["package"]
 
         # First try retrieving from the cache
-        result = self.cache.get(self.cache_name)
+        result = None if full else self.cache.get(self.cache_name)
         if not result or not self.use_cache:
             version = "@%s" % self.version if self.version else ""
             logger.info(
                 "Retrieving new result for package %s%s..." % (self.name, version)
             )
-            pkg = manager.package(self.name)
+            fetch = self.use_cache and not full
             result = endpoints.get_endpoint(
-                "package", data=pkg, package_name=self.name, manager=self.manager
+                "package",
+                package_name=self.name,
+                manager=self.manager,
+                cache_name=self.cache_name if fetch else None,
+                retrieve=lambda: manager.package(self.name),
             )
+
+            # Without the cache (or for a full record), fetch didn't save it
+            if not fetch:
+                self.cache.set(self.cache_name, result)
         else:
             result = endpoints.get_endpoint(
                 "package", data=result, package_name=self.name, manager=self.manager
             )
-
-        # If cache is enabled, we save the result
-        self.cache.set(self.cache_name, result)
         self.data["package"] = result.data
         return result
 
@@ -252,23 +264,26 @@ class Package(PackageBase):
                 manager=self.manager,
                 package_name=self.name,
                 version=self.version,
+                cache_name=cache_name if self.use_cache else None,
             )
+
+            # Without the cache, fetch didn't save it for us
+            if not self.use_cache:
+                self.cache.set(cache_name, result)
         else:
             result = endpoints.get_endpoint("dependencies", data=result)
-
-        # If cache is enabled, we save the result
-        self.cache.set(cache_name, result)
         deps = result.data.get("dependencies", [])
         self.data["dependencies"] = deps
         if return_data:
             return deps
         return result
 
-    def info(self):
+    def info(self, full=False):
         """
-        Get info for a libraries.io package
+        Get info for a libraries.io package. We cache a slim record (with only
+        what we use) so ask for full to retrieve everything.
         """
-        result = self.cache.get(self.cache_name)
+        result = None if full else self.cache.get(self.cache_name)
         if not result and not self.manager:
             return result
 
@@ -277,11 +292,17 @@ class Package(PackageBase):
             logger.info(
                 "Retrieving new result for package %s%s..." % (self.name, version)
             )
+            fetch = self.use_cache and not full
             result = endpoints.get_endpoint(
                 "package",
                 manager=self.manager,
                 package_name=self.name,
+                cache_name=self.cache_name if fetch else None,
             )
+
+            # Without the cache (or for a full record), fetch didn't save it
+            if not fetch:
+                self.cache.set(self.cache_name, result)
         else:
             result = endpoints.get_endpoint(
                 "package", data=result, manager=self.manager, package_name=self.name
@@ -290,6 +311,5 @@ class Package(PackageBase):
         # Set a latest version if we find one
         if "versions" in result.data and result.data["versions"]:
             self.latest = result.data["versions"][-1]["number"]
-        self.cache.set(self.cache_name, result)
         self.data["package"] = result.data
         return result
@@ -7,10 +7,9 @@ __license__ = "MPL 2.0"
 import os
 import sys
 
-import requests
-
 import citelang.main.cache as cache
 import citelang.main.endpoints as endpoints
+import citelang.main.http as http
 import citelang.utils as utils
 from citelang.logger import logger
 
@@ -54,7 +53,7 @@ class PackageManager:
         """
         Shared endpoint to get a url or fail.
         """
-        response = requests.get(url, headers=headers)
+        response = http.get_session().get(url, headers=headers)
         if response.status_code != 200:
             logger.exit("Cannot retrieve %s: %s" % (url, response.json()))
         if return_text:
@@ -126,6 +125,7 @@ class PackagesFromFile(PackageManager):
                     "package",
                     package_name=package_name,
                     manager=self.underlying_manager,
+                    cache_name=f"package/{self.underlying_manager}/{package_name}",
                 )
             except Exception:
                 pass
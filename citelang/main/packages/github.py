@@ -6,8 +6,7 @@ __license__ = "MPL 2.0"
 
 import os
 
-import requests
-
+import citelang.main.http as http
 import citelang.utils as utils
 from citelang.logger import logger
 
@@ -31,7 +30,7 @@ def find_dependencies(repo):
 
     repos = set()
     while url is not None:
-        response = requests.get(url)
+        response = http.get_session().get(url)
         if response.status_code != 200:
             logger.warning("Issue getting dependencies for %s" % repo)
             return [{"name": x} for x in sorted(list(repos))]
@@ -5,8 +5,8 @@ __license__ = "MPL 2.0"
 # Custom package managers not in libraries IO
 
 import jsonschema
-import requests
 
+import citelang.main.http as http
 import citelang.main.schemas as schemas
 from citelang.logger import logger
 
@@ -28,7 +28,8 @@ class SpackManager(PackageManager):
     @property
     def project_count(self):
         try:  # "pythonic"
-            return len(requests.get("%s/packages.json" % self.apiroot).json())
+            url = "%s/packages.json" % self.apiroot
+            return len(http.get_session().get(url).json())
         except Exception:
             return None
 
@@ -48,7 +49,7 @@ class SpackManager(PackageManager):
         Get metadata for a spack package. Try to format like libraries.io
         """
         url = "%s/packages/%s.json" % (self.apiroot, name)
-        response = requests.get(url)
+        response = http.get_session().get(url)
         if response.status_code != 200:
             logger.exit("There was an issue retrieving %s" % url)
 
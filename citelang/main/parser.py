@@ -2,11 +2,16 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2022, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
+import importlib.util
+import itertools
 import os
 import re
+import time
 from operator import itemgetter
 
 import citelang.main.base as base
+import citelang.main.graph as graph
+import citelang.main.http as http
 import citelang.main.package as package
 import citelang.main.packages as packages
 import citelang.main.result as results
@@ -19,6 +24,8 @@ table_template = """|Manager|Name|Credit|
 
 template_suffix = "\n> Note that credit values are rounded and expanded (so shared dependencies are represented as one record) and may not add to 1.0. Rounded values that hit zero are removed.\n"
 
+truncated_suffix = "\n> Note that the dependency graph was truncated by a deadline, so packages that were not looked into keep the credit of their dependencies.\n"
+
 citation_regex = "\@([a-zA-Z0-9]+)\{(.*?)\}"  # noqa
 
 
@@ -34,6 +41,10 @@ class Parser(base.BaseClient):
         self.libs = []
         self.round_by = 3
         self.roots = {}
+        self.truncated = False
+
+        # Dependencies we've looked up, shared between roots
+        self.resolved = graph.Resolved()
 
     def gen(self, name, manager, *args, **kwargs):
         """
@@ -55,6 +66,15 @@ class Parser(base.BaseClient):
         """
         Update roots for new libraries we've found
         """
+        # Roots share the dependencies we've already looked up
+        if kwargs.get("resolved") is None:
+            kwargs["resolved"] = self.resolved
+
+        # A deadline is for all roots together
+        deadline = kwargs.get("deadline")
+        if deadline is not None:
+            end = time.time() + deadline
+
         for lib in self.libs:
             if "name" not in lib or "manager" not in lib:
                 logger.warning("Skipping %s, missing name or manager." % lib)
@@ -68,6 +88,8 @@ class Parser(base.BaseClient):
                 version = lib.get("version") or lib.get("release")
                 uid = "%s@%s" % (uid, version)
                 lib["name"] = "%s@%s" % (lib["name"], version)
+            if deadline is not None:
+                kwargs["deadline"] = max(end - time.time(), 0)
             self.roots[uid] = self._graph(
                 manager=lib["manager"], name=lib["name"], **kwargs
             )
@@ -82,6 +104,7 @@ class Parser(base.BaseClient):
         # Add listing of packages and dependencies to parser
         self.data = table
         self.round_by = round_by
+        self.truncated = any(root.truncated for root in self.roots.values())
         return self
 
     def _prepare_table(self, roots):
@@ -104,6 +127,155 @@ class Parser(base.BaseClient):
                 table[node.obj.manager][node.name]["credit"] += node.credit * splitby
         return table, root.round_by
 
+    def sweep(
+        self,
+        credit_split=None,
+        min_credit=None,
+        max_depth=None,
+        max_deps=None,
+        use_cache=True,
+        workers=None,
+    ):
+        """
+        Calculate the credit table for libraries for a grid of credit_split
+        and min_credit values, and return a long format table (a Sweep).
+
+        We resolve the dependency graph once (with the smallest values) and
+        then calculate credit for each pair without any requests, with numpy
+        arrays if numpy is installed.
+        """
+        credit_split = sorted(set(credit_split or [0.5]))
+        min_credit = sorted(set(min_credit or [0.01]))
+
+        roots = []
+        for lib in self.libs:
+            if "name" not in lib or "manager" not in lib:
+                logger.warning("Skipping %s, missing name or manager." % lib)
+                continue
+            name = lib["name"]
+            version = lib.get("version") or lib.get("release")
+            if version and "@" not in name:
+                name = "%s@%s" % (name, version)
+            if (lib["manager"], name) not in roots:
+                roots.append((lib["manager"], name))
+
+        if not roots:
+            logger.exit("There are no libraries to calculate credit for.")
+
+        # Resolve all roots into one graph
+        resolved = graph.Resolved()
+        for manager, name in roots:
+            self._graph(
+                manager=manager,
+                name=name,
+                use_cache=use_cache,
+                max_depth=max_depth,
+                max_deps=max_deps,
+                min_credit=min_credit[0],
+                credit_split=credit_split[0],
+                workers=workers,
+                resolved=resolved,
+            )
+        resolved.frozen = True
+
+        # Calculate credit with arrays if we can, otherwise walk the tree
+        if importlib.util.find_spec("numpy"):
+            import citelang.main.graph.vector as vector
+
+            credit_graph = vector.CreditGraph(resolved)
+
+            def get_table(**kwargs):
+                return credit_graph.table(roots, **kwargs)
+
+        else:
+
+            def get_table(**kwargs):
+                sweep_roots = {}
+                for manager, name in roots:
+                    uid = "%s:%s" % (manager, name)
+                    sweep_roots[uid] = self._graph(
+                        manager=manager, name=name, resolved=resolved, **kwargs
+                    )
+                return self._prepare_table(sweep_roots)[0]
+
+        rows = []
+        for split, credit in itertools.product(credit_split, min_credit):
+            table = get_table(
+                credit_split=split,
+                min_credit=credit,
+                max_depth=max_depth,
+                max_deps=max_deps,
+            )
+            listing = []
+            for manager, pkgs in table.items():
+                for pkg, meta in pkgs.items():
+                    listing.append(
+                        {
+                            "manager": manager,
+                            "name": pkg,
+                            "credit_split": split,
+                            "min_credit": credit,
+                            "credit": meta["credit"],
+                        }
+                    )
+            rows += sorted(listing, key=itemgetter("credit"), reverse=True)
+        return results.Sweep(rows)
+
+    def warm(self, specs, rate=None, use_cache=True, **kwargs):
+        """
+        Resolve the dependencies of manifests (e.g., requirements.txt) or
+        manager:name pairs into the cache, with at most rate requests a
+        minute, and return counts (and throughput) for what we looked up.
+
+        The keyword arguments (e.g., max_depth, min_credit, workers) are the
+        same as for a graph, so we look up what credit for it would.
+        """
+        start = time.time()
+        requests = http.counts["requests"]
+        not_modified = http.counts[304]
+        http.set_rate(rate)
+        try:
+            for spec in specs:
+                if os.path.isfile(spec):
+                    parser = RequirementsParser()
+                    parser.resolved = self.resolved
+                    name = os.path.basename(os.path.dirname(os.path.abspath(spec)))
+                    parser.gen(
+                        name=name,
+                        filename=spec,
+                        use_cache=use_cache,
+                        resolved=self.resolved,
+                        **kwargs,
+                    )
+                    continue
+
+                manager, _, name = spec.partition(":")
+                if not name:
+                    logger.exit("%s is not a file or manager:name." % spec)
+                self._graph(
+                    manager=manager,
+                    name=name,
+                    use_cache=use_cache,
+                    resolved=self.resolved,
+                    **kwargs,
+                )
+        finally:
+            http.set_rate(None)
+
+        seconds = max(time.time() - start, 1e-6)
+        requests = http.counts["requests"] - requests
+        return {
+            "roots": len(specs),
+            "packages": len(self.resolved.packages),
+            "requests": requests,
+            "not_modified": http.counts[304] - not_modified,
+            "seconds": round(seconds, 3),
+            "packages_per_second": round(len(self.resolved.packages) / seconds, 3),
+            "requests_per_second": round(requests / seconds, 3),
+            "quota_limit": http.quota.get("limit"),
+            "quota_remaining": http.quota.get("remaining"),
+        }
+
     def prepare_custom_table(
         self,
         includes,
@@ -238,6 +410,11 @@ class FileNameParser(Parser):
                 credit,
             )
 
+        # Note if we ran out of time before parsing the whole graph
+        suffix = template_suffix
+        if self.truncated:
+            suffix += truncated_suffix
+
         if not self.rendering_content:
             content = self.empty_content
         else:
@@ -256,10 +433,10 @@ class FileNameParser(Parser):
                     render += (
                         [self.start_block]
                         + markdown.split("\n")
-                        + [template_suffix, self.end_block]
+                        + [suffix, self.end_block]
                     )
                 else:
-                    render += markdown.split("\n") + [template_suffix]
+                    render += markdown.split("\n") + [suffix]
 
             else:
                 render.append(line)
@@ -352,6 +529,12 @@ class RequirementsParser(FileNameParser):
             # Populate dependencies and package
             pkg.info()
 
+            # Roots share the dependencies we've already looked up, but
+            # another file with the same package name is a different root
+            if kwargs.get("resolved") is None:
+                kwargs["resolved"] = self.resolved
+                self.resolved.packages.pop(graph.Resolved.get_uid(pkg), None)
+
             uid = "%s:%s" % (basename, filename)
             self.roots[uid] = self._graph(
                 manager=pkg.underlying_manager.underlying_manager,
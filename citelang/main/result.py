@@ -2,6 +2,8 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2022, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
+import csv
+import io
 import json
 import os
 
@@ -209,6 +211,39 @@ class Table(Result):
         console.print(table, justify="center")
 
 
+class Sweep(Table):
+    """
+    A sweep is a long format table of credit for each package and parameters.
+    """
+
+    columns = ["manager", "name", "credit_split", "min_credit", "credit"]
+
+    def to_csv(self, delimiter=","):
+        """
+        Return the table as comma (or other delimiter) separated values
+        """
+        out = io.StringIO()
+        writer = csv.DictWriter(
+            out, fieldnames=self.columns, delimiter=delimiter, lineterminator="\n"
+        )
+        writer.writeheader()
+        writer.writerows(self.data)
+        return out.getvalue()
+
+    def print_result(self):
+        print(self.to_csv(), end="")
+
+    def save(self, outfile):
+        """
+        Save to output file (json, tsv, or otherwise csv)
+        """
+        if outfile.endswith(".json"):
+            return super().save(outfile)
+        logger.info("Saving to %s..." % outfile)
+        delimiter = "\t" if outfile.endswith(".tsv") else ","
+        utils.write_file(self.to_csv(delimiter), outfile)
+
+
 class Tree(Result):
     def __init__(self, result):
         self.result = result
@@ -236,7 +271,11 @@ class Tree(Result):
             "color": color_lookup[self.result.name],
         }
 
+        # A node shared in a DAG is only expanded the first time
+        seen = set()
+
         def add(data, children, total, levels=1):
+            seen.add(data)
             total += data.credit
             if data.children:
                 child_size = 100 / len(data.children)
@@ -254,7 +293,8 @@ class Tree(Result):
                     "children": [],
                     "color": color_lookup[child.name],
                 }
-                total, levels = add(child, node["children"], total, levels)
+                if child not in seen:
+                    total, levels = add(child, node["children"], total, levels)
                 children.append(node)
             return total, levels
 
@@ -263,6 +303,8 @@ class Tree(Result):
         self.data = data
         self.data["total"] = total
         self.data["levels"] = levels
+        self.data["unexpanded"] = self.result.unexpanded_credit
+        self.data["truncated"] = self.result.truncated
 
     def print_result(self):
         """
@@ -283,6 +325,10 @@ class Tree(Result):
 
         print_result(self.data)
         print("total: %s" % round(self.data["total"], 3))
+        if self.data["unexpanded"]:
+            print("unexpanded: %s" % round(self.data["unexpanded"], 3))
+        if self.data["truncated"]:
+            print("truncated: the deadline was reached before parsing all dependencies")
 
 
 class Graph(Result):
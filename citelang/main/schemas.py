@@ -75,8 +75,29 @@ package = {
 # Currently all of these are required
 settingsProperties = {
     "cache_dir": {"type": "string"},
+    "cache_backend": {"type": "string", "enum": ["filesystem", "sqlite", "lmdb"]},
     "disable_cache": {"type": "boolean"},
     "disable_memory_cache": {"type": "boolean"},
+    "memory_cache_max_entries": {"type": ["null", "integer"], "minimum": 1},
+    "memory_cache_max_bytes": {"type": ["null", "integer"], "minimum": 1},
+    "cache_encoding": {"type": "string", "enum": ["json", "msgpack"]},
+    "cache_compression": {"type": ["null", "string"], "enum": [None, "gzip", "zstd"]},
+    "cache_slim": {"type": "boolean"},
+    "cache_dedup": {"type": "boolean"},
+    "refresh_stale": {"type": "boolean"},
+    "cache_bundles": {"type": "array", "items": {"type": "string"}},
+    "http_pool_size": {"type": "integer", "minimum": 1},
+    "http_keep_alive": {"type": "boolean"},
+    "cache_ttl": {
+        "type": "object",
+        "properties": {
+            "package": {"type": ["null", "number"], "minimum": 0},
+            "dependencies": {"type": ["null", "number"], "minimum": 0},
+            "package_managers": {"type": ["null", "number"], "minimum": 0},
+            "empty": {"type": ["null", "number"], "minimum": 0},
+        },
+        "additionalProperties": False,
+    },
 }
 
 settings = {
@@ -85,8 +106,20 @@ settings = {
     "type": "object",
     "required": [
         "disable_memory_cache",
+        "memory_cache_max_entries",
+        "memory_cache_max_bytes",
         "disable_cache",
         "cache_dir",
+        "cache_backend",
+        "cache_encoding",
+        "cache_compression",
+        "cache_slim",
+        "cache_dedup",
+        "refresh_stale",
+        "cache_bundles",
+        "http_pool_size",
+        "http_keep_alive",
+        "cache_ttl",
     ],
     "properties": settingsProperties,
     "additionalProperties": False,
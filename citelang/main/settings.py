@@ -194,6 +194,14 @@ class SettingsBase:
             value = value.strip()
         return value
 
+    def parse_integer(self, value):
+        """
+        Given a number from the command line, ensure parsed as an integer
+        """
+        if isinstance(value, str) and value.isdigit():
+            return int(value)
+        return value
+
     def set(self, key, value):
         """
         Set a setting based on key and value. If the key has :, it's nested
@@ -209,10 +217,10 @@ class SettingsBase:
         if isinstance(value, str) and ":" in value:
             subkey, value = value.split(":")
             value = self.parse_boolean(value)
-            value = self.parse_null(value)
+            value = self.parse_integer(self.parse_null(value))
             self._settings[key][subkey] = value
         else:
-            value = self.parse_null(value)
+            value = self.parse_integer(self.parse_null(value))
             self._settings[key] = value
 
         # Validate and catch error message cleanly
@@ -234,7 +242,7 @@ class SettingsBase:
         """
         Given a value, make substitutions
         """
-        if isinstance(value, bool) or not value:
+        if isinstance(value, (bool, int)) or not value:
             return value
 
         # Currently dicts only support boolean or null so we return as is
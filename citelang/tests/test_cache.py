@@ -0,0 +1,715 @@
+#!/usr/bin/python
+
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import citelang.main.cache as cache
+import citelang.main.endpoints as endpoints
+import citelang.main.http as http
+import citelang.main.package as package
+import citelang.main.packages as packages
+import citelang.main.result as results
+import citelang.main.settings as settings
+import citelang.utils as utils
+from citelang.main.cache import encoding, lock
+from citelang.main.packages.base import PackageManager
+
+backends = ["filesystem", "sqlite", "lmdb"]
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """
+    Settings to use instead of the user's (set a key to change one)
+    """
+    values = {}
+    get = settings.cfg.get
+    monkeypatch.setattr(
+        settings.cfg,
+        "get",
+        lambda key, default=None: values.get(key, get(key, default)),
+    )
+    return values
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch, config):
+    """
+    Use a temporary cache directory (and no memory cache)
+    """
+    cache_dir = str(tmp_path / "cache")
+    config.update({"cache_dir": cache_dir, "disable_memory_cache": True})
+    monkeypatch.setattr(cache.Cache, "_cache", cache.MemoryCache())
+    return cache_dir
+
+
+def get_cache(backend):
+    if backend == "lmdb":
+        pytest.importorskip("lmdb")
+    return cache.Cache(backend)
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_cache(cache_dir, backend):
+    """
+    Each backend can set, get, and mark empty.
+    """
+    db = get_cache(backend)
+    name = "package/pypi/requests/2.27.1"
+    assert db.get(name) is None
+    db.set(name, results.Result({"name": "requests"}))
+    assert db.get(name) == {"name": "requests"}
+
+    assert not db.is_empty("package/pypi/doesnotexist")
+    db.mark_empty("package/pypi/doesnotexist")
+    assert db.is_empty("package/pypi/doesnotexist")
+
+    assert [x[0] for x in db.iterate()] == [name]
+    assert [x[0] for x in db.iterate(empty=True)] == ["package/pypi/doesnotexist"]
+    stats = db.stats()
+    assert stats["backend"] == backend
+
+    # The entry points to a blob of its data
+    assert stats["entries"] == 2 and stats["empty"] == 1 and stats["size"] > 0
+
+    db.clear(force=True)
+    assert db.get(name) is None
+    assert not db.is_empty("package/pypi/doesnotexist")
+
+
+def test_memory_cache():
+    """
+    The memory cache evicts the least recently used to stay in budget.
+    """
+    memory = cache.MemoryCache(max_entries=2)
+    memory.set(
+        "package/pypi/requests/2.27.1",
+        {"name": "requests"},
+        alias="package/pypi/requests",
+    )
+    memory.set("package/pypi/six", {"name": "six"})
+    assert memory.get("package/pypi/requests") == {"name": "requests"}
+    memory.set("package/pypi/idna", {"name": "idna"})
+    assert "package/pypi/six" not in memory
+    assert memory.get("package/pypi/six") is None
+
+    # A versioned name and its alias are one entry
+    memory.set("package/pypi/urllib3", {"name": "urllib3"})
+    assert "package/pypi/requests" not in memory
+    assert not memory.aliases
+    stats = memory.stats()
+    assert stats["entries"] == 2
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 2)
+
+    # Or to stay within a size (of the json) in bytes
+    memory = cache.MemoryCache(max_bytes=30)
+    memory.set("package/pypi/requests", {"name": "requests"})
+    memory.set("package/pypi/six", {"name": "six"})
+    assert len(memory) == 1 and memory.stats()["bytes"] == 14
+    memory.set("package/pypi/idna", {"name": "idna"})
+    assert len(memory) == 2 and memory.stats()["bytes"] == 29
+
+
+def test_memory_fallback(cache_dir, config, monkeypatch):
+    """
+    A result evicted from memory is read from the backend (and kept again).
+    """
+    config["disable_memory_cache"] = False
+    monkeypatch.setattr(cache.Cache, "_cache", cache.MemoryCache(max_entries=1))
+    db = cache.Cache("filesystem")
+    db.set("package/pypi/requests", results.Result({"name": "requests"}))
+    db.set("package/pypi/six", results.Result({"name": "six"}))
+    assert "package/pypi/requests" not in db._cache
+    assert db.get("package/pypi/requests") == {"name": "requests"}
+    assert "package/pypi/requests" in db._cache
+    assert db.stats()["memory"]["evictions"] == 2
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_stale(cache_dir, backend, config):
+    """
+    With refresh_stale, entries older than the cache_ttl for their type are stale.
+    """
+    db = get_cache(backend)
+    name = "package/pypi/requests"
+    db.set(name, results.Result({"name": "requests"}))
+    db.set("dependencies/pypi/requests/2.27.1", results.Result({"name": "requests"}))
+    assert not db.is_stale(name)
+
+    # Not stale unless we are refreshing stale entries
+    db.backend.set(name, {"name": "requests"}, updated=time.time() - 31 * 86400)
+    assert not db.is_stale(name)
+    config["refresh_stale"] = True
+    assert db.is_stale(name)
+    assert db.get(name) is None
+    assert not db.is_stale("dependencies/pypi/requests/2.27.1")
+    assert not db.is_stale("package/pypi/doesnotexist")
+
+
+def test_revalidate(cache_dir, config, monkeypatch):
+    """
+    A stale entry with an etag is retrieved again only if it changed.
+    """
+    requests = []
+
+    def get_conditional(url, etag=None, last_modified=None):
+        requests.append(etag)
+        if etag == "v1":
+            return None, {"etag": "v1", "last_modified": None}
+        return {"name": "requests"}, {"etag": "v1", "last_modified": None}
+
+    monkeypatch.setattr(cache.http, "get_conditional", get_conditional)
+    config["refresh_stale"] = True
+    db = cache.Cache("filesystem")
+    name = "package/pypi/requests"
+    assert db.fetch(name, "https://libraries.io") == {"name": "requests"}
+    assert db.backend.get("validators/%s" % name) == {"etag": "v1"}
+
+    # A fresh entry is not retrieved again, and a stale one is revalidated
+    assert db.fetch(name, "https://libraries.io") == {"name": "requests"}
+    db.backend.set(name, {"name": "requests"}, updated=time.time() - 31 * 86400)
+    assert db.fetch(name, "https://libraries.io") == {"name": "requests"}
+    assert requests == [None, "v1"]
+    assert not db.is_stale(name)
+
+
+@pytest.mark.parametrize(
+    "cache_encoding,cache_compression",
+    [("json", None), ("json", "gzip"), ("msgpack", None), ("msgpack", "zstd")],
+)
+def test_encoding(cache_encoding, cache_compression):
+    """
+    Entries are detected as any encoding (and compression) on read.
+    """
+    if cache_encoding == "msgpack":
+        pytest.importorskip("msgpack")
+    if cache_compression == "zstd":
+        pytest.importorskip("zstandard")
+    data = {"name": "requests", "versions": [{"number": "2.27.1"}]}
+    content = encoding.encode(data, cache_encoding, cache_compression)
+    assert isinstance(content, bytes)
+    assert encoding.decode(content) == data
+    if cache_compression:
+        assert len(content) != len(encoding.encode(data))
+
+    # Pretty printed json (as we used to write) is still read
+    assert encoding.decode(utils.print_json(data).encode("utf-8")) == data
+    assert encoding.decode(utils.print_json(data)) == data
+
+
+def test_compact_entries(cache_dir, config):
+    """
+    Filesystem entries are compact, and entries from before are still read.
+    """
+    db = cache.Cache("filesystem")
+    data = {"name": "requests", "versions": [{"number": "2.27.1"}]}
+    db.set("package/pypi/requests", results.Result(data))
+    blob = db.backend.get("package/pypi/requests")[cache.blob_key]
+    path = db.get_cache_name(blob)
+    assert (
+        utils.read_file(path) == '{"name":"requests","versions":[{"number":"2.27.1"}]}'
+    )
+
+    utils.write_json(data, path)
+    assert db.get("package/pypi/requests") == data
+
+    config["cache_compression"] = "gzip"
+    db.set("package/pypi/six", results.Result({"name": "six"}))
+    blob = db.backend.get("package/pypi/six")[cache.blob_key]
+    with open(db.get_cache_name(blob), "rb") as fd:
+        assert fd.read(2) == encoding.gzip_magic
+    assert db.get("package/pypi/six") == {"name": "six"}
+
+    # And sqlite entries that are json text
+    db = cache.Cache("sqlite")
+    db.backend.db.execute(
+        "INSERT INTO entries VALUES (?, ?, ?, ?)",
+        ("package/pypi/idna", utils.print_json({"name": "idna"}), 1, 0),
+    )
+    assert db.get("package/pypi/idna") == {"name": "idna"}
+    db.backend.close()
+
+
+def test_slim(cache_dir):
+    """
+    We only cache the fields of a package that we use.
+    """
+    data = {
+        "name": "requests",
+        "homepage": "https://requests.readthedocs.io",
+        "description": "Python HTTP for Humans.",
+        "keywords": ["http", "python"],
+        "latest_release_number": "2.27.1",
+        "versions": [
+            {"number": "2.27.1", "published_at": "2022-01-05T00:00:00.000Z"},
+            {"number": "2.27.0", "published_at": "2022-01-03T00:00:00.000Z"},
+        ],
+    }
+    for version in data["versions"]:
+        version.update({"spdx_expression": "Apache-2.0", "researched_at": None})
+
+    db = cache.Cache("filesystem")
+    result = endpoints.get_endpoint("package", data=data)
+    db.set("package/pypi/requests", result)
+    slim = db.get("package/pypi/requests")
+    assert set(slim) == {"name", "homepage", "latest_release_number", "versions"}
+    assert slim["versions"] == [
+        {"number": "2.27.0", "published_at": "2022-01-03T00:00:00.000Z"},
+        {"number": "2.27.1", "published_at": "2022-01-05T00:00:00.000Z"},
+    ]
+
+    # What we were given is not changed
+    assert "description" in result.data
+    assert "spdx_expression" in result.data["versions"][0]
+
+    # Dependencies only lose version fields
+    deps = {"name": "requests", "dependencies": [{"name": "idna", "kind": "runtime"}]}
+    deps["versions"] = data["versions"]
+    db.set(
+        "dependencies/pypi/requests/2.27.1",
+        endpoints.get_endpoint("dependencies", data=deps),
+    )
+    slim = db.get("dependencies/pypi/requests/2.27.1")
+    assert slim["dependencies"] == deps["dependencies"]
+    assert slim["versions"][0] == {
+        "number": "2.27.0",
+        "published_at": "2022-01-03T00:00:00.000Z",
+    }
+
+
+def test_empty_index(cache_dir):
+    """
+    Empty markers are one index (and .empty files from before are imported).
+    """
+    old = os.path.join(cache_dir, "package", "go", "example.com", "doesnotexist.empty")
+    os.makedirs(os.path.dirname(old))
+    utils.write_file("", old)
+    updated = int(time.time()) - 60
+    os.utime(old, (updated, updated))
+
+    db = cache.Cache("filesystem")
+    assert db.is_empty("package/go/example.com/doesnotexist")
+    assert not os.path.exists(old)
+    db.mark_empty("package/pypi/doesnotexist")
+    assert db.is_empty("package/pypi/doesnotexist")
+    assert len(utils.read_file(db.backend.empty_index).splitlines()) == 2
+
+    # A new backend (e.g., another process) reads the index
+    db = cache.Cache("filesystem")
+    assert (
+        dict(db.iterate(empty=True))["package/go/example.com/doesnotexist"] == updated
+    )
+    assert db.is_empty("package/pypi/doesnotexist")
+    assert db.stats()["empty"] == 2
+
+
+def test_empty_import_once(cache_dir, monkeypatch):
+    """
+    Importing .empty files skips names another process already imported,
+    and files it already removed.
+    """
+    old = os.path.join(cache_dir, "package", "pypi", "doesnotexist.empty")
+    os.makedirs(os.path.dirname(old))
+    utils.write_file("", old)
+
+    db = cache.Cache("filesystem")
+    utils.write_file("1.0\tpackage/pypi/doesnotexist\n", db.backend.empty_index)
+    remove = os.remove
+
+    # Another process removes the file just before we do
+    def removed(path):
+        remove(path)
+        remove(path)
+
+    monkeypatch.setattr(os, "remove", removed)
+    empty = db.backend._import_empty(db.backend.empty_index)
+    assert empty == {"package/pypi/doesnotexist": 1.0}
+    assert not os.path.exists(old)
+    assert utils.read_file(db.backend.empty_index).count("doesnotexist") == 1
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_empty_ttl(cache_dir, backend, config):
+    """
+    A package marked empty is tried again after the cache_ttl for empty.
+    """
+    db = get_cache(backend)
+    db.mark_empty("package/pypi/doesnotexist")
+    db.backend.mark_empty("package/pypi/old", updated=time.time() - 31 * 86400)
+    assert db.is_empty("package/pypi/doesnotexist")
+    assert not db.is_empty("package/pypi/old")
+
+    config["cache_ttl"] = {"empty": None}
+    assert db.is_empty("package/pypi/old")
+
+
+def test_fetch_once(cache_dir, monkeypatch):
+    """
+    Threads that want the same name wait for the first to retrieve it.
+    """
+    requests = []
+
+    def get_conditional(url, etag=None, last_modified=None):
+        requests.append(url)
+        time.sleep(0.2)
+        return {"name": "requests"}, {}
+
+    monkeypatch.setattr(cache.http, "get_conditional", get_conditional)
+    db = cache.Cache("filesystem")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        fetched = list(
+            executor.map(
+                lambda _: db.fetch("package/pypi/requests", "https://libraries.io"),
+                range(4),
+            )
+        )
+    assert fetched == [{"name": "requests"}] * 4
+    assert len(requests) == 1
+
+    # And entries are written whole (there is nothing left over)
+    files = os.listdir(os.path.join(cache_dir, "package", "pypi"))
+    assert files == ["requests.json"]
+
+
+def test_fetch_custom_once(cache_dir, monkeypatch):
+    """
+    A custom package manager is asked for a package once between threads.
+    """
+    requests = []
+
+    class Manager(PackageManager):
+        name = "fake"
+        project_count = 1
+        homepage = color = default_language = None
+        default_versions = ["main"]
+
+        def package(self, name, **kwargs):
+            requests.append(name)
+            time.sleep(0.2)
+            return {"name": name, "dependencies": [{"name": "zlib"}]}
+
+    monkeypatch.setitem(packages.managers, "fake", Manager)
+    db = cache.Cache("filesystem")
+    monkeypatch.setattr(cache, "cache", db)
+
+    def dependencies(_):
+        pkg = package.CustomPackage("fake", "curl@7.8")
+        return pkg.dependencies(return_data=True)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        deps = list(executor.map(dependencies, range(4)))
+    assert deps == [[{"name": "zlib"}]] * 4
+    assert requests == ["curl"]
+    assert db.backend.get("package/fake/curl/7.8")
+
+
+def test_lock_nested(tmp_path):
+    """
+    A thread can lock a name while it holds another (or the same) one.
+    """
+    keylock = cache.KeyLock(str(tmp_path / "cache.lock"))
+    with keylock("package/pip/requirements.txt"):
+        with keylock("package/pypi/requests"), keylock("package/pypi/requests"):
+            pass
+    assert not keylock._locks
+    keylock.close()
+
+
+def try_lock(path, name):
+    """
+    Exit with 1 if another process holds the lock for a name.
+    """
+    fd = os.open(path, os.O_RDWR)
+    offset = zlib.crc32(name.encode("utf-8"))
+    try:
+        lock.fcntl.lockf(fd, lock.fcntl.LOCK_EX | lock.fcntl.LOCK_NB, 1, offset)
+    except OSError:
+        os._exit(1)
+    os._exit(0)
+
+
+@pytest.mark.skipif(lock.fcntl is None, reason="fcntl is not available")
+def test_lock_reentry(tmp_path):
+    """
+    Leaving a nested block for a name keeps the lock until the outer one ends.
+    """
+    path = str(tmp_path / "cache.lock")
+    name = "package/pypi/requests"
+    keylock = cache.KeyLock(path)
+
+    def locked():
+        process = multiprocessing.Process(target=try_lock, args=(path, name))
+        process.start()
+        process.join()
+        return process.exitcode == 1
+
+    with keylock(name):
+        with keylock(name):
+            assert locked()
+        assert locked()
+    assert not locked()
+    keylock.close()
+
+
+def hold_lock(path, held):
+    with cache.KeyLock(path)("package/pypi/requests"):
+        held.set()
+        time.sleep(0.5)
+
+
+@pytest.mark.skipif(lock.fcntl is None, reason="fcntl is not available")
+def test_lock_processes(tmp_path):
+    """
+    A lock for a name is held between processes (and other names are not).
+    """
+    path = str(tmp_path / "cache.lock")
+    held = multiprocessing.Event()
+    process = multiprocessing.Process(target=hold_lock, args=(path, held))
+    process.start()
+    assert held.wait(10)
+
+    keylock = cache.KeyLock(path)
+    start = time.time()
+    with keylock("package/pypi/six"):
+        assert time.time() - start < 0.4
+    with keylock("package/pypi/requests"):
+        assert time.time() - start > 0.3
+    process.join()
+    keylock.close()
+
+
+def test_rate_limiter():
+    """
+    Requests to warm the cache are spaced out to a rate a minute.
+    """
+    limiter = http.RateLimiter(600)
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: limiter.wait(), range(4)))
+    assert time.time() - start >= 0.3
+
+
+@pytest.mark.parametrize("keep_alive", [True, False])
+def test_session(config, monkeypatch, keep_alive):
+    """
+    Every request shares one session with a pool of http_pool_size connections.
+    """
+    config.update({"http_pool_size": 4, "http_keep_alive": keep_alive})
+    monkeypatch.setattr(http, "session", None)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        sessions = set(executor.map(lambda _: http.get_session(), range(8)))
+    assert len(sessions) == 1
+    session = sessions.pop()
+    for prefix in ["https://", "http://"]:
+        adapter = session.get_adapter(prefix + "libraries.io")
+        assert adapter._pool_maxsize == 4
+    assert session.headers["Connection"] == ("keep-alive" if keep_alive else "close")
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "lmdb"])
+def test_migrate(cache_dir, backend):
+    """
+    A directory cache can be imported into another backend.
+    """
+    files = cache.Cache("filesystem")
+    files.set("package_managers", results.Result([{"name": "pypi"}]))
+    files.set("package/pypi/requests", results.Result({"name": "requests"}))
+    files.mark_empty("package/pypi/doesnotexist")
+    os.utime(files.get_cache_name("package_managers"), (1000, 1000))
+
+    # Each entry points to a blob of its data
+    db = get_cache(backend)
+    assert db.migrate(cache_dir) == (4, 1)
+    assert os.path.exists(db.backend.db_path)
+    assert db.get("package_managers") == [{"name": "pypi"}]
+    assert db.get("package/pypi/requests") == {"name": "requests"}
+    assert db.is_empty("package/pypi/doesnotexist")
+
+    # Entries keep the time they were updated
+    assert dict(db.iterate())["package_managers"] == 1000
+    stats = db.stats()
+    assert stats["entries"] == 4 and stats["empty"] == 1
+    db.backend.close()
+
+
+def test_bundle(cache_dir, tmp_path, config):
+    """
+    A cache (or what we used from it) can be exported to a bundle, read from
+    where it is, and merged into another cache.
+    """
+    db = cache.Cache("filesystem")
+    db.set("package_managers", results.Result([{"name": "pypi"}]))
+    db.set("package/pypi/requests/2.27.1", results.Result({"name": "requests"}))
+    db.set("package/pypi/numpy/1.22.3", results.Result({"name": "numpy"}))
+    db.mark_empty("package/pypi/doesnotexist")
+
+    # Each entry and the blob it points to
+    bundle = str(tmp_path / "cache.bundle")
+    assert db.export(bundle) == (6, 1)
+
+    # Only what we used, e.g., to resolve a graph
+    with db.recording() as recorded:
+        db.get("package_managers")
+        db.get("package/pypi/requests/2.27.1")
+        assert db.is_empty("package/pypi/doesnotexist")
+    partial = str(tmp_path / "partial.bundle")
+    assert db.export(partial, recorded) == (4, 1)
+    reader = cache.BundleBackend(partial)
+    assert db.load(reader, "package/pypi/requests/2.27.1") == {"name": "requests"}
+    assert reader.get("package/pypi/numpy/1.22.3") is None
+    reader.close()
+
+    # A bundle can be read (without unpacking) after an empty cache
+    db.clear(force=True)
+    assert db.get("package/pypi/numpy/1.22.3") is None
+    config["cache_bundles"] = [bundle]
+    assert db.get("package/pypi/numpy/1.22.3") == {"name": "numpy"}
+    assert db.is_empty("package/pypi/doesnotexist")
+    assert not list(db.iterate())
+
+    # Importing merges, keeping entries we have that are newer
+    db.set("package_managers", results.Result([{"name": "npm"}]))
+    assert db.migrate(cache.BundleBackend(bundle), merge=True) == (5, 1)
+    assert db.get("package_managers") == [{"name": "npm"}]
+    assert db.get("package/pypi/requests/2.27.1") == {"name": "requests"}
+    assert db.migrate(cache.BundleBackend(bundle), merge=True) == (0, 0)
+
+    with open(partial, "r+b") as fd:
+        fd.truncate(20)
+    with pytest.raises(SystemExit):
+        cache.BundleBackend(partial).get("package_managers")
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_counts(cache_dir, backend):
+    """
+    The cache counts hits for each tier and bytes, and size by endpoint.
+    """
+    db = get_cache(backend)
+    cache.counts.clear()
+    db.set("package_managers", results.Result([{"name": "pypi"}]))
+    db.set("package/pypi/requests/2.27.1", results.Result({"name": "requests"}))
+    db.set("dependencies/npm/express/4.0.0", results.Result({"name": "express"}))
+    db.mark_empty("package/pypi/doesnotexist")
+
+    assert db.get("package/pypi/requests/2.27.1") == {"name": "requests"}
+    assert db.get("package/pypi/doesnotexist") is None
+    assert db.is_empty("package/pypi/doesnotexist")
+    assert not db.is_empty("package/pypi/requests")
+
+    counts = db.stats()["counts"]
+    assert counts["disk_hits"] == 1 and counts["disk_misses"] == 1
+    assert counts["negative_hits"] == 1 and counts["negative_misses"] == 1
+    assert counts["bytes_read"] > 0 and counts["bytes_written"] > counts["bytes_read"]
+    assert "memory_hits" not in counts
+
+    usage = db.usage()
+    assert set(usage) == {"package_managers", "package", "dependencies", "blobs"}
+    assert usage["package"]["pypi"]["entries"] == 1
+    assert usage["dependencies"]["npm"]["size"] > 0
+    assert sum(x["size"] for m in usage.values() for x in m.values()) == (
+        db.backend.stats()["size"]
+    )
+    if backend == "lmdb":
+        db.backend.close()
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_prune(cache_dir, backend):
+    """
+    Prune removes entries not used recently, then least recently used, and
+    stores a package with and without a version once if they are the same.
+    """
+    db = get_cache(backend)
+    now = time.time()
+    for i, name in enumerate(["a", "b", "c", "d"]):
+        db.backend.set("package/pypi/%s/1.0" % name, {"name": name * 100}, now - i)
+    db.backend.set("package/npm/old/1.0", {"name": "old"}, now - 100 * 86400)
+    db.backend.set("package/pypi/a", {"name": "a" * 100}, now - 10)
+    db.backend.set("validators/package/npm/gone", {"etag": "x"}, now)
+
+    # Using an entry makes it the most recently used
+    db.get("package/pypi/d/1.0")
+
+    stats = db.prune(older_than=30, dry_run=True)
+    assert stats["expired"] == 1 and stats["duplicates"] == 2
+    assert db.backend.updated("package/npm/old/1.0")
+    assert not cache.get_blob(db.backend.get("package/pypi/a"))
+
+    # Only for pypi, then for everything
+    stats = db.prune(older_than=30, managers=["pypi"])
+    assert stats["expired"] == 0 and stats["duplicates"] == 2
+    stats = db.prune(older_than=30)
+    assert stats["expired"] == 1 and stats["orphans"] == 1
+    assert stats["duplicates"] == 0
+    assert db.backend.updated("package/npm/old/1.0") is None
+
+    # Both names find the data they share (and keep when they were updated)
+    for name in ["package/pypi/a", "package/pypi/a/1.0"]:
+        assert cache.get_blob(db.backend.get(name))
+        assert db.get(name) == {"name": "a" * 100}
+    assert db.backend.updated("package/pypi/a") == pytest.approx(now - 10)
+
+    # Least recently used first, to a size (we just used both names for a)
+    sizes = dict(db.backend.sizes())
+    blob = cache.get_blob(db.backend.get("package/pypi/a/1.0"))
+    size = sum(sizes[x] for x in [blob, "package/pypi/a", "package/pypi/a/1.0"])
+    stats = db.prune(max_size=size)
+    assert stats["evicted"] == 3 and stats["remaining"] == size
+    assert sorted(x for x, _ in db.iterate()) == [
+        "package/pypi/a",
+        "package/pypi/a/1.0",
+    ]
+    if backend == "lmdb":
+        db.backend.close()
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_dedup(cache_dir, backend, config, monkeypatch):
+    """
+    The same data under more than one name is one blob, loaded once, and
+    pruned when nothing points to it.
+    """
+    config["disable_memory_cache"] = False
+    db = get_cache(backend)
+    data = {"name": "requests", "versions": [{"number": "2.27.1"}]}
+    db.set("package/pypi/requests", results.Result(data))
+    db.set("package/pypi/requests/2.27.1", results.Result(dict(data)))
+    db.set("package/pypi/six", results.Result({"name": "six"}))
+    blobs = [x for x, _ in db.backend.iterate() if x.startswith("blobs/")]
+    assert len(blobs) == 2
+    assert sorted(x for x, _ in db.iterate()) == [
+        "package/pypi/requests",
+        "package/pypi/requests/2.27.1",
+        "package/pypi/six",
+    ]
+
+    # From the backend, the blob is parsed once for both names
+    monkeypatch.setattr(cache.Cache, "_cache", cache.MemoryCache())
+    first = db.get("package/pypi/requests")
+    assert first == data
+    assert db.get("package/pypi/requests/2.27.1") is first
+    assert len(db._cache) == 1
+
+    # The blob is removed with the last name that points to it
+    stats = db.prune(older_than=0, managers=["npm"])
+    assert stats["entries"] == 0
+    db.backend.delete("package/pypi/six")
+    stats = db.prune()
+    assert stats["orphans"] == 1 and stats["duplicates"] == 0
+    assert len([x for x, _ in db.backend.iterate() if x.startswith("blobs/")]) == 1
+    assert db.get("package/pypi/requests/2.27.1") == data
+    assert db.get("package/pypi/requests") == data
+
+    # Or we can keep the data for each name
+    config["cache_dedup"] = False
+    db.set("package/pypi/idna", results.Result({"name": "idna"}))
+    assert db.backend.get("package/pypi/idna") == {"name": "idna"}
+    if backend == "lmdb":
+        db.backend.close()
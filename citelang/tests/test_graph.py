@@ -0,0 +1,423 @@
+#!/usr/bin/python
+
+import itertools
+
+import pytest
+
+import citelang.main.base as base
+import citelang.main.client as client
+import citelang.main.graph.graph as graph_module
+import citelang.main.package as package
+
+# A small dependency tree with shared packages (six, idna) and a cycle
+dependencies = {
+    "requests": ["urllib3", "idna", "certifi", "chardet", "six"],
+    "urllib3": ["idna", "six", "pysocks", "certifi"],
+    "chardet": ["six", "__pycache__"],
+    "certifi": [],
+    "idna": ["six", "unicodedata2"],
+    "pysocks": ["six", "win-inet-pton"],
+    "six": ["requests"],
+    "unicodedata2": [],
+    "win-inet-pton": [],
+}
+
+
+class FakePackage(package.PackageBase):
+    """
+    A package that reads dependencies from the dictionary above.
+    """
+
+    calls = []
+
+    def dependencies(self, return_data=False):
+        self.calls.append(self.name)
+        return [{"name": x, "project_name": x} for x in dependencies.get(self.name, [])]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """
+    Replace package lookup so we don't need libraries.io
+    """
+    FakePackage.calls = []
+
+    def get_package(manager, name, *args, **kwargs):
+        return FakePackage(manager, name)
+
+    monkeypatch.setattr(package, "get_package", get_package)
+    monkeypatch.setattr(base.BaseClient, "check_manager", lambda *args: None)
+    return FakePackage
+
+
+def get_table(root):
+    """
+    Get a flattened credit table for a root
+    """
+    cli = client.get_parser()
+    table, _ = cli._prepare_table({"pypi:requests": root})
+    return {name: meta["credit"] for name, meta in table["pypi"].items()}
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"min_credit": 0.001},
+        {"min_credit": 0.001, "max_deps": 12},
+        {"min_credit": 0.001, "max_depth": 2},
+    ],
+)
+def test_workers(fake, kwargs):
+    """
+    Retrieving a level at once should not change credit (or what we look up).
+    """
+    kwargs["credit_split"] = 0.5
+    cli = client.Client()
+    serial = get_table(cli._graph("pypi", "requests", **kwargs))
+    calls = sorted(fake.calls)
+    fake.calls.clear()
+    parallel = get_table(cli._graph("pypi", "requests", workers=4, **kwargs))
+    assert parallel == pytest.approx(serial)
+    assert sorted(fake.calls) == calls
+
+
+@pytest.mark.parametrize("min_credit", [0.01, 0.001])
+def test_dag(fake, min_credit, capsys):
+    """
+    A DAG has one node per package, and credit still adds up to 1.
+    """
+    cli = client.Client()
+    root = cli._graph("pypi", "requests", min_credit=min_credit, dag=True)
+    names = [node.name for node in root.iternodes()]
+    assert sorted(names) == sorted(dependencies)
+    assert sorted(fake.calls) == sorted(set(fake.calls))
+    assert sum(get_table(root).values()) == pytest.approx(1.0)
+
+    # Shared packages collect credit from more than one parent
+    six = [node for node in root.iternodes() if node.name == "six"][0]
+    assert len([n for n in root.iternodes() if six in n.children]) > 1
+
+    for fmt in [None, "cypher", "gexf", "dot"]:
+        cli.graph(name="requests", manager="pypi", fmt=fmt, dag=True)
+    cli.credit(name="requests", manager="pypi", dag=True).print_result()
+    assert "six" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("traversal", ["bfs", "best-first"])
+@pytest.mark.parametrize("min_credit", [0.001, 0.08])
+def test_dag_diamond(fake, monkeypatch, traversal, min_credit):
+    """
+    Credit that reaches a DAG node after we looked into it still goes on to
+    its dependencies, and a node we skipped is looked into if it gets enough.
+    """
+    for name, deps in {"a": ["b", "c"], "c": ["b"], "b": ["d", "e"]}.items():
+        monkeypatch.setitem(dependencies, name, deps)
+    cli = client.Client()
+    kwargs = {"credit_split": 0.5, "min_credit": min_credit, "traversal": traversal}
+    credit = get_table(cli._graph("pypi", "a", dag=True, **kwargs))
+    expected = {"a": 0.5, "c": 0.125, "b": 0.1875, "d": 0.09375, "e": 0.09375}
+    assert credit == pytest.approx(expected)
+    exact = get_table(cli._graph("pypi", "a", exact=True, **kwargs))
+    assert credit == pytest.approx(exact)
+
+
+def test_dag_late_credit(fake, monkeypatch):
+    """
+    Credit that reaches the top of a deep shared graph late is passed on once
+    for each node, not once for every path through it.
+    """
+    # top -> x, and a long chain to x, so x is looked into before the chain ends
+    layers = 20
+    shared = {"top": ["x", "chain-1"], "x": ["layer-1-0", "layer-1-1"]}
+    for i in range(1, 25):
+        shared["chain-%s" % i] = ["chain-%s" % (i + 1) if i < 24 else "x"]
+    for i in range(1, layers):
+        for j in range(2):
+            shared["layer-%s-%s" % (i, j)] = ["layer-%s-%s" % (i + 1, x) for x in "01"]
+    for name, deps in shared.items():
+        monkeypatch.setitem(dependencies, name, deps)
+
+    calls = []
+    add_child = graph_module.DAGNode.add_child
+
+    def counted(self, child, weight=0):
+        calls.append(child)
+        return add_child(self, child, weight)
+
+    monkeypatch.setattr(graph_module.DAGNode, "add_child", counted)
+    cli = client.Client()
+    kwargs = {"credit_split": 0.5, "min_credit": 0}
+    credit = get_table(cli._graph("pypi", "top", dag=True, **kwargs))
+    assert len(calls) < 1000
+    assert sum(credit.values()) == pytest.approx(1.0)
+    exact = get_table(cli._graph("pypi", "top", exact=True, **kwargs))
+    assert credit == pytest.approx(exact)
+
+
+def test_exact_wide_diamond(fake, monkeypatch):
+    """
+    Exact credit for a wide DAG looks up each package once, without walking
+    each of its (many) paths.
+    """
+    # 30 layers of 4, each depending on all of the next (4^30 paths)
+    layers, width = 30, 4
+    wide = {"top": ["layer-1-%s" % j for j in range(width)]}
+    for i in range(1, layers):
+        for j in range(width):
+            wide["layer-%s-%s" % (i, j)] = [
+                "layer-%s-%s" % (i + 1, k) for k in range(width)
+            ]
+    for name, deps in wide.items():
+        monkeypatch.setitem(dependencies, name, deps)
+
+    calls = []
+    add_child = graph_module.DAGNode.add_child
+
+    def counted(self, child, weight=0):
+        calls.append(child)
+        return add_child(self, child, weight)
+
+    # The exact graph adds each edge once, and each package is looked up once
+    monkeypatch.setattr(graph_module.DAGNode, "add_child", counted)
+    cli = client.Client()
+    credit = get_table(cli._graph("pypi", "top", exact=True, credit_split=0.5))
+    assert len(calls) == sum(len(deps) for deps in wide.values())
+    assert len(fake.calls) == 1 + layers * width
+    assert sum(credit.values()) == pytest.approx(1.0)
+    assert credit["layer-1-0"] == pytest.approx(0.5 / width / 2)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"dag": True}, {"exact": True}])
+def test_nameless_dependency(fake, monkeypatch, kwargs, tmp_path):
+    """
+    A dependency without a name still counts when we split credit, with or
+    without a resolved graph.
+    """
+    monkeypatch.setitem(dependencies, "pancakes", ["syrup", ""])
+    monkeypatch.setitem(dependencies, "syrup", [])
+    cli = client.Client()
+    expected = get_table(cli._graph("pypi", "pancakes", **kwargs))
+
+    outfile = str(tmp_path / "pancakes.json")
+    cli.resolve("pypi", "pancakes").save(outfile)
+    root = cli._graph("pypi", "pancakes", resolved=outfile, **kwargs)
+    assert get_table(root) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("dag", [False, True])
+def test_resolved(fake, dag, tmp_path):
+    """
+    Credit from a saved resolved graph is the same, without requests.
+    """
+    cli = client.Client()
+    resolved = cli.resolve("pypi", "requests", min_credit=0.001, dag=dag)
+    outfile = str(tmp_path / "requests.json")
+    resolved.save(outfile)
+
+    for kwargs in [
+        {"min_credit": 0.001},
+        {"min_credit": 0.01, "credit_split": 0.8},
+        {"min_credit": 0.005, "max_depth": 2},
+    ]:
+        kwargs["dag"] = dag
+        expected = get_table(cli._graph("pypi", "requests", **kwargs))
+        calls = len(fake.calls)
+        for source in [resolved, outfile]:
+            root = cli._graph("pypi", "requests", resolved=source, **kwargs)
+            assert get_table(root) == pytest.approx(expected)
+        assert len(fake.calls) == calls
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"min_credit": 0.001},
+        {"min_credit": 0.0005, "credit_split": 0.2},
+        {"min_credit": 0.001, "max_deps": 5},
+        {"min_credit": 0.001, "max_depth": 1},
+        {"min_credit": 0.2},
+    ],
+)
+def test_vector(fake, kwargs):
+    """
+    Credit calculated with arrays is the same as walking the tree.
+    """
+    vector = pytest.importorskip("citelang.main.graph.vector")
+    cli = client.Client()
+    resolved = cli.resolve("pypi", "requests", min_credit=0.0001, credit_split=0.1)
+    kwargs["credit_split"] = kwargs.get("credit_split", 0.5)
+    expected = get_table(cli._graph("pypi", "requests", resolved=resolved, **kwargs))
+
+    table = vector.CreditGraph(resolved).table([("pypi", "requests")], **kwargs)
+    result = {name: meta["credit"] for name, meta in table["pypi"].items()}
+    assert result == pytest.approx(expected)
+
+
+def test_sweep(fake, tmp_path):
+    """
+    A sweep has the same credit as each pair of parameters on its own.
+    """
+    cli = client.get_parser()
+    cli.add_lib(manager="pypi", name="requests")
+    result = cli.sweep(credit_split=[0.3, 0.5], min_credit=[0.001, 0.01])
+    calls = len(fake.calls)
+
+    for credit_split in [0.3, 0.5]:
+        for min_credit in [0.001, 0.01]:
+            expected = get_table(
+                cli._graph(
+                    "pypi", "requests", credit_split=credit_split, min_credit=min_credit
+                )
+            )
+            rows = [
+                x
+                for x in result.data
+                if x["credit_split"] == credit_split and x["min_credit"] == min_credit
+            ]
+            assert {x["name"]: x["credit"] for x in rows} == pytest.approx(expected)
+
+    # The graph is only resolved once
+    assert calls == len(set(fake.calls))
+
+    for ext in ["csv", "tsv", "json"]:
+        outfile = str(tmp_path / ("sweep.%s" % ext))
+        result.save(outfile)
+        assert "requests" in open(outfile).read()
+
+
+@pytest.mark.parametrize("dag", [False, True])
+def test_best_first(fake, dag, capsys):
+    """
+    Best first traversal leaves less credit on nodes we didn't expand.
+    """
+    cli = client.Client()
+    kwargs = {"min_credit": 0.001, "credit_split": 0.5, "dag": dag}
+    bfs = cli._graph("pypi", "requests", max_deps=8 if not dag else 4, **kwargs)
+    best = cli._graph(
+        "pypi",
+        "requests",
+        max_deps=8 if not dag else 4,
+        traversal="best-first",
+        **kwargs
+    )
+    assert 0 < best.unexpanded_credit < bfs.unexpanded_credit
+
+    # Without a budget a tree expands the same nodes
+    if not dag:
+        bfs = cli._graph("pypi", "requests", **kwargs)
+        best = cli._graph("pypi", "requests", traversal="best-first", **kwargs)
+        assert get_table(best) == pytest.approx(get_table(bfs))
+        assert best.unexpanded_credit == pytest.approx(bfs.unexpanded_credit)
+
+    cli.credit(
+        name="requests", manager="pypi", max_deps=4, traversal="best-first", **kwargs
+    ).print_result()
+    assert "unexpanded" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("dag", [False, True])
+def test_deadline(fake, dag, monkeypatch):
+    """
+    Running out of time stops looking, and the result is marked truncated.
+    """
+    cli = client.Client()
+    root = cli._graph("pypi", "requests", deadline=0, dag=dag)
+    assert root.truncated and not fake.calls
+    assert get_table(root) == {"requests": 1.0}
+
+    # Every look at the clock takes a second
+    clock = itertools.count()
+    monkeypatch.setattr(base.time, "time", lambda: next(clock))
+    root = cli._graph("pypi", "requests", min_credit=0.001, deadline=5, dag=dag)
+    assert root.truncated and len(fake.calls) == 5
+
+    # This is the same place that we stop for max deps
+    expected = cli._graph("pypi", "requests", min_credit=0.001, max_deps=5, dag=dag)
+    assert get_table(root) == pytest.approx(get_table(expected))
+
+    # Workers don't look up the rest of a level after the deadline
+    fake.calls.clear()
+    clock = itertools.count()
+    kwargs = {"min_credit": 0.001, "deadline": 5, "dag": dag, "workers": 4}
+    assert cli._graph("pypi", "requests", **kwargs).truncated
+    assert len(fake.calls) < 5
+
+    clock = itertools.count()
+    cli = client.get_parser()
+    result = cli.gen("requests", "pypi", min_credit=0.001, deadline=5, dag=dag)
+    assert "truncated by a deadline" in result.render()
+
+
+@pytest.mark.parametrize("dag", [False, True])
+def test_shared_roots(fake, dag):
+    """
+    Roots of a parser share the dependencies we've looked up.
+    """
+    cli = client.Client()
+    kwargs = {"min_credit": 0.001, "dag": dag}
+    roots = {
+        "pypi:%s" % name: cli._graph("pypi", name, **kwargs)
+        for name in ["requests", "urllib3"]
+    }
+    expected, _ = client.get_parser()._prepare_table(roots)
+
+    fake.calls = []
+    parser = client.get_parser()
+    parser.add_lib(manager="pypi", name="requests")
+    parser.add_lib(manager="pypi", name="urllib3")
+    parser._update_roots(**kwargs)
+    assert sorted(fake.calls) == sorted(set(fake.calls))
+    table, _ = parser._prepare_table(parser.roots)
+    for name, meta in expected["pypi"].items():
+        assert table["pypi"][name]["credit"] == pytest.approx(meta["credit"])
+
+
+def test_shared_records(fake):
+    """
+    Nodes for the same package share one slim record.
+    """
+    cli = client.Client()
+    root = cli._graph("pypi", "requests", min_credit=0.001)
+    six = [node for node in root.iternodes() if node.name == "six"]
+    assert len(six) > 1 and len({id(node.obj) for node in six}) == 1
+    assert not hasattr(root, "__dict__") and not hasattr(six[0].obj, "__dict__")
+    assert sorted(fake.calls) == sorted(set(fake.calls))
+
+
+def test_exact(fake, tmp_path):
+    """
+    Exact credit passes all weight through the DAG (except for cycles).
+    """
+    cli = client.Client()
+    root = cli._graph("pypi", "requests", credit_split=0.5, exact=True)
+    assert sorted(node.name for node in root.iternodes()) == sorted(dependencies)
+    assert sorted(fake.calls) == sorted(set(fake.calls))
+    credit = get_table(root)
+    assert sum(credit.values()) == pytest.approx(1.0)
+
+    # Weight flows down (six -> requests is a cycle), iterate until it settles
+    weights = {name: 0 for name in dependencies}
+    for _ in range(len(dependencies)):
+        updated = {name: 1.0 if name == "requests" else 0 for name in dependencies}
+        for name, deps in dependencies.items():
+            for dep in deps:
+                if dep in weights and (name, dep) != ("six", "requests"):
+                    updated[dep] += 0.5 * weights[name] / len(deps)
+        weights = updated
+    for name, deps in dependencies.items():
+        passed = sum(0.5 * weights[name] / len(deps) for x in deps if x in weights)
+        if name == "six":
+            passed = 0
+        assert credit[name] == pytest.approx(weights[name] - passed)
+
+    # The same from a saved resolved graph, without requests
+    outfile = str(tmp_path / "requests.json")
+    cli.resolve("pypi", "requests", min_credit=0, dag=True).save(outfile)
+    calls = len(fake.calls)
+    root = cli._graph(
+        "pypi", "requests", credit_split=0.5, exact=True, resolved=outfile
+    )
+    assert get_table(root) == pytest.approx(credit)
+    assert len(fake.calls) == calls
@@ -98,3 +98,40 @@ def test_print_json():
 
     result = utils.print_json({1: 1})
     assert result == '{\n    "1": 1\n}'
+
+
+def test_parse_size():
+    print("Testing utils.parse_size")
+
+    assert utils.parse_size("1000") == 1000
+    assert utils.parse_size("2k") == 2048
+    assert utils.parse_size("1.5MB") == int(1.5 * 1024**2)
+    assert utils.parse_size("2G") == 2 * 1024**3
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_codec(tmp_path, monkeypatch, use_orjson):
+    print("Testing utils.dumps_json, loads_json")
+
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(utils.fileio, "orjson", None)
+
+    data = {"name": "requests", "versions": [{"number": "2.27.1"}], "rank": 1.5}
+    content = utils.dumps_json(data)
+    assert isinstance(content, bytes)
+    assert content == json.dumps(data, separators=(",", ":")).encode("utf-8")
+    assert utils.loads_json(content) == data
+    assert utils.loads_json(content.decode("utf-8")) == data
+
+    # Keys that aren't strings fall back to json
+    assert utils.loads_json(utils.dumps_json({1: "one"})) == {"1": "one"}
+
+    # Files only citelang reads don't need to be pretty
+    tmpfile = str(tmp_path / "compact.json")
+    utils.write_json(data, tmpfile, pretty=False)
+    assert utils.read_file(tmpfile) == content.decode("utf-8")
+    assert utils.read_json(tmpfile) == data
+    with pytest.raises(TypeError):
+        utils.write_json({"bad": {True}}, tmpfile, pretty=False)
@@ -1,6 +1,8 @@
 from .fileio import (
+    dumps_json,
     get_tmpdir,
     get_tmpfile,
+    loads_json,
     mkdir_p,
     print_json,
     read_file,
@@ -10,7 +12,7 @@ from .fileio import (
     write_file,
     write_json,
 )
-from .string import get_terminal_pad, update_nested
+from .string import get_terminal_pad, parse_size, update_nested
 from .terminal import (
     clone,
     confirm_action,
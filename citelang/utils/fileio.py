@@ -12,6 +12,12 @@ import tempfile
 
 import yaml
 
+# orjson is faster, but optional (pip install citelang[orjson])
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def mkdir_p(path):
     """mkdir_p attempts to get the same functionality as mkdir -p
@@ -49,12 +55,17 @@ def write_file(content, filename, mode="w", exec=False):
     return filename
 
 
-def write_json(json_obj, filename, mode="w"):
+def write_json(json_obj, filename, mode="w", pretty=True):
     """
-    Write json to a filename
+    Write json to a filename, compact (and faster) if it doesn't need to be
+    pretty (e.g., a file only citelang reads)
     """
+    if not pretty:
+        with open(filename, mode.replace("b", "") + "b") as filey:
+            filey.write(dumps_json(json_obj))
+        return filename
     with open(filename, mode) as filey:
-        filey.writelines(print_json(json_obj))
+        filey.write(print_json(json_obj))
     return filename
 
 
@@ -65,6 +76,29 @@ def print_json(json_obj):
     return json.dumps(json_obj, indent=4, separators=(",", ": "))
 
 
+def dumps_json(json_obj):
+    """
+    Dump json to compact bytes, with orjson if it is installed
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(json_obj)
+
+        # e.g., keys that aren't strings, or integers larger than 64 bits
+        except TypeError:
+            pass
+    return json.dumps(json_obj, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(content):
+    """
+    Load json from bytes (or a string), with orjson if it is installed
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
 def read_file(filename, mode="r"):
     """
     Read a file.
@@ -78,7 +112,7 @@ def read_json(filename, mode="r"):
     """
     Read a json file to a dictionary.
     """
-    return json.loads(read_file(filename))
+    return loads_json(read_file(filename, "rb"))
 
 
 def read_yaml(filename):
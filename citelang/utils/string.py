@@ -17,6 +17,19 @@ def get_terminal_pad(size):
         return 30
 
 
+def parse_size(size):
+    """
+    Parse a size in bytes, optionally with a unit (e.g., 500M or 2G)
+    """
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    size = str(size).strip().upper().rstrip("B")
+    multiplier = 1
+    if size and size[-1] in units:
+        multiplier = units[size[-1]]
+        size = size[:-1]
+    return int(float(size) * multiplier)
+
+
 def update_nested(data, update):
     """
     recursive function to update nested dict
@@ -2,7 +2,7 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2022, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
-__version__ = "0.0.35"
+__version__ = "0.0.60"
 AUTHOR = "Vanessa Sochat"
 EMAIL = "vsoch@users.noreply.github.com"
 NAME = "citelang"
@@ -29,9 +29,28 @@ BADGE_REQUIRES = (
     ("kaleido", {"min_version": None}),
 )
 
+VECTOR_REQUIRES = (("numpy", {"min_version": None}),)
+
+LMDB_REQUIRES = (("lmdb", {"min_version": None}),)
+
+MSGPACK_REQUIRES = (("msgpack", {"min_version": None}),)
+
+ZSTD_REQUIRES = (("zstandard", {"min_version": None}),)
+
+ORJSON_REQUIRES = (("orjson", {"min_version": None}),)
+
 TESTS_REQUIRES = (("pytest", {"min_version": "4.6.2"}),)
 
 ################################################################################
 # Submodule Requirements (versions that include database)
 
-INSTALL_REQUIRES_ALL = INSTALL_REQUIRES + TESTS_REQUIRES + BADGE_REQUIRES
+INSTALL_REQUIRES_ALL = (
+    INSTALL_REQUIRES
+    + TESTS_REQUIRES
+    + BADGE_REQUIRES
+    + VECTOR_REQUIRES
+    + LMDB_REQUIRES
+    + MSGPACK_REQUIRES
+    + ZSTD_REQUIRES
+    + ORJSON_REQUIRES
+)
@@ -61,6 +61,11 @@ if __name__ == "__main__":
     INSTALL_REQUIRES = get_reqs(lookup)
     TESTS_REQUIRES = get_reqs(lookup, "TESTS_REQUIRES")
     BADGE_REQUIRES = get_reqs(lookup, "BADGE_REQUIRES")
+    VECTOR_REQUIRES = get_reqs(lookup, "VECTOR_REQUIRES")
+    LMDB_REQUIRES = get_reqs(lookup, "LMDB_REQUIRES")
+    MSGPACK_REQUIRES = get_reqs(lookup, "MSGPACK_REQUIRES")
+    ZSTD_REQUIRES = get_reqs(lookup, "ZSTD_REQUIRES")
+    ORJSON_REQUIRES = get_reqs(lookup, "ORJSON_REQUIRES")
     INSTALL_REQUIRES_ALL = get_reqs(lookup, "INSTALL_REQUIRES_ALL")
 
     setup(
@@ -84,6 +89,11 @@ if __name__ == "__main__":
         extras_require={
             "all": [INSTALL_REQUIRES_ALL],
             "badge": [BADGE_REQUIRES],
+            "vector": [VECTOR_REQUIRES],
+            "lmdb": [LMDB_REQUIRES],
+            "msgpack": [MSGPACK_REQUIRES],
+            "zstd": [ZSTD_REQUIRES],
+            "orjson": [ORJSON_REQUIRES],
         },
         classifiers=[
             "Intended Audience :: Science/Research",